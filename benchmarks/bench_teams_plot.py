@@ -0,0 +1,110 @@
+"""
+Compares the data preparation of plots.create_teams_plot before and after the highlight layer was built with
+a single index join, on synthetic data with the size of a full league. It needs neither the database nor the
+credentials modules.
+
+Run from the repository root:
+    python -m benchmarks.bench_teams_plot
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import utils.labels as labels
+import utils.plots as plots
+import utils.ranks as ranks
+
+
+POSITIONS = ['Abwehrspieler', 'Außenverteidiger', 'Mittelfeldspieler', 'Flügelspieler', 'Angreifer']
+TEAMS = 20
+PLAYERS_PER_TEAM_AND_POSITION = 6
+REPEAT = 20
+
+# Zusammenfassende Attribute der Mittelfeldspieler (helpers.get_attributes_summary)
+ATTRIBUTES = ['involvement_z', 'progression_z', 'passing_quality_z', 'providing_teammates_z', 'box_threat_z',
+              'active_defense_z', 'intelligent_defense_z', 'effectiveness_z']
+
+
+def synthetic_league(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    attributes = sorted(set(labels.create_y_labels()))
+    rows = TEAMS * len(POSITIONS) * PLAYERS_PER_TEAM_AND_POSITION
+    data = pd.DataFrame(rng.normal(size=(rows, len(attributes))).astype('float32'), columns=attributes)
+    data['player_name'] = [f'Spieler {i}' for i in range(rows)]
+    data['team_name'] = np.repeat([f'Team {i}' for i in range(TEAMS)], rows // TEAMS)
+    data['position'] = np.tile(np.repeat(POSITIONS, PLAYERS_PER_TEAM_AND_POSITION), TEAMS)
+    data['minutes_played'] = rng.integers(0, 3060, size=rows)
+    return data
+
+
+def old_teams_plot_data(data, attributes, team, position):
+    y_labels = labels.create_y_labels()
+    position_data = data[data['position'] == position]
+    team_data = data[(data['team_name'] == team) & (data['position'] == position)]
+
+    plot_data_list = []
+    for attribute in attributes:
+        temp_data = pd.DataFrame({
+            'Player': position_data['player_name'],
+            'Value': position_data[attribute].values.flatten(),
+            'Attribute': attribute,
+            'Y': y_labels[attribute]
+        })
+        temp_data['Rank'] = temp_data['Value'].rank(ascending=False, method='min')
+        temp_data['Total'] = len(temp_data)
+        temp_data['Rank_Display'] = temp_data.apply(lambda row: f"{int(row['Rank'])}/{int(row['Total'])}", axis=1)
+        plot_data_list.append(temp_data)
+    plot_data = pd.concat(plot_data_list)
+
+    highlight_data_list = []
+    for attribute in attributes:
+        for player in team_data['player_name']:
+            temp_data = pd.DataFrame({
+                'Player': [player],
+                'Value': [team_data[team_data['player_name'] == player][attribute].values.flatten()[0]],
+                'Attribute': [attribute],
+                'Y': [y_labels[attribute]]
+            })
+            temp_data['Rank'] = plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player)]['Rank'].values[0]
+            temp_data['Total'] = plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player)]['Total'].values[0]
+            temp_data['Rank_Display'] = f"{int(temp_data['Rank'][0])}/{int(temp_data['Total'][0])}"
+            highlight_data_list.append(temp_data)
+    return plot_data, pd.concat(highlight_data_list)
+
+
+def new_teams_plot_data(data, attributes, team, position, rank_table):
+    position_data = data[data['position'] == position]
+    team_data = data[(data['team_name'] == team) & (data['position'] == position)]
+    plot_data = plots.build_plot_data(position_data, attributes, rank_table)
+    team_rows = position_data.index.get_indexer(team_data.index)
+    return plot_data, plots.select_plot_rows(plot_data, len(position_data), team_rows)
+
+
+def main():
+    data = synthetic_league()
+    position = 'Mittelfeldspieler'
+    team = 'Team 0'
+    attributes = ATTRIBUTES
+    # Die Ränge werden in der App einmal pro Datensatz berechnet (helpers.get_ranks)
+    rank_table = ranks.RankTable(data)
+
+    old_plot, old_highlight = old_teams_plot_data(data, attributes, team, position)
+    new_plot, new_highlight = new_teams_plot_data(data, attributes, team, position, rank_table)
+    columns = ['Player', 'Value', 'Attribute', 'Y', 'Rank', 'Total', 'Rank_Display']
+    pd.testing.assert_frame_equal(old_highlight[columns].reset_index(drop=True), new_highlight[columns],
+                                  check_dtype=False)
+    assert len(old_plot) == len(new_plot)
+
+    old_time = min(timeit.repeat(lambda: old_teams_plot_data(data, attributes, team, position),
+                                 number=1, repeat=REPEAT))
+    new_time = min(timeit.repeat(lambda: new_teams_plot_data(data, attributes, team, position, rank_table),
+                                 number=1, repeat=REPEAT))
+    print(f"{len(data)} Spieler, {len(attributes)} Attribute, {PLAYERS_PER_TEAM_AND_POSITION} Teamspieler")
+    print(f"Schleife: {old_time * 1000:.2f} ms")
+    print(f"Join:     {new_time * 1000:.2f} ms")
+    print(f"Faktor:   {old_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
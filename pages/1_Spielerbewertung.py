@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import utils.helpers as helpers
 import utils.plots as plots
-from utils.chatbot import get_player_evaluation, get_player_evaluation_german
+from utils.chatbot import get_player_evaluation_german, stream_player_evaluation
 from utils.passwords import inject_ga
 
 inject_ga()
@@ -10,7 +12,7 @@ inject_ga()
 #st.set_page_config(layout="wide")
 
 # Daten laden
-dataframe = helpers.preload_data()
+registry = helpers.preload_data()
 
 # Header with logo and app name placeholder
 st.sidebar.image('images/logo.jpg', use_column_width=True)
@@ -30,11 +32,14 @@ selected_league = leagues[selected_league_display]
 selected_season = seasons[selected_season_display]
 
 # Dataframe welcher geladen werden soll
-data = helpers.get_data_by_league_and_season(dataframe, selected_league, selected_season)
+data = registry.get(selected_league, selected_season)
+if data is None:
+    st.error(f'Für {selected_league_display} {selected_season_display} konnten keine Daten geladen werden. Bitte später erneut versuchen.')
+    st.stop()
 # Formular zur Spielerauswahl in der Seitenleiste
 position = st.sidebar.selectbox('Position', ['Abwehrspieler', 'Außenverteidiger', 'Mittelfeldspieler', 'Flügelspieler', 'Angreifer'])
-# Spieler aus Dataframe laden und Filter für Position
-players =sorted(data[data['position'] == position]['player_name'])
+# Spieler der Position aus der vorberechneten Partition laden
+players = sorted(helpers.get_position_data(selected_league, selected_season, position)['player_name'])
 # Auswahl in der Sidebar
 player = st.sidebar.selectbox('Spieler', players)
 # Auswahl der Qualität
@@ -48,22 +53,54 @@ st.header('Bewertung von ' + player + ' ' + selected_quality_display, divider=Tr
 attributes = helpers.get_attributes_details(selected_quality, position)
 
 
-# Plot erstellen
-chart = plots.create_player_plot(data, attributes, player, position, selected_league_display, selected_season_display, selected_quality_display)
-st.altair_chart(chart, use_container_width=True)
-
-
-# Beschreibung der Spielerbewertung
-with st.spinner('Generiere Spielerbewertung...'):
-    st.write('🏴󠁧󠁢󠁥󠁮󠁧󠁿')
-    evaluation = get_player_evaluation(player, attributes, data)
-    st.success(evaluation)
-
-    # Beschreibung der Spielerbewertung
+# Plot aus dem gemeinsamen Chart-Cache
+spec = helpers.get_player_chart(selected_league, selected_season, position, selected_quality, player, 0,
+                                selected_league_display, selected_season_display, selected_quality_display)
+if spec:
+    st.vega_lite_chart(spec, use_container_width=True)
+else:
+    st.write(f"No data available for player {player} in position {position}.")
+
+# Ähnliche Spieler über die Attribut-Z-Scores suchen
+with st.expander('Ähnliche Spieler finden'):
+    all_datasets = st.toggle('In allen Wettbewerben und Saisons suchen')
+    detailed = st.toggle('Alle Attribute vergleichen')
+    similar_count = st.slider('Anzahl Spieler', min_value=5, max_value=25, value=10, step=5)
+    similar_players = helpers.find_similar_players(
+        player, selected_league, selected_season, position, n=similar_count,
+        leagues=list(leagues.values()) if all_datasets else None,
+        seasons=list(seasons.values()) if all_datasets else None,
+        detailed=detailed
+    )
+    league_displays = {value: key for key, value in leagues.items()}
+    season_displays = {value: key for key, value in seasons.items()}
+    similar_players['league'] = similar_players['league'].map(league_displays)
+    similar_players['season'] = similar_players['season'].map(season_displays)
+    similar_players.columns = ['Spieler', 'Team', 'Position', 'Minuten gespielt', 'Wettbewerb', 'Saison', 'Distanz']
+    st.dataframe(similar_players, hide_index=True)
+
+
+# Beschreibung der Spielerbewertung auf Englisch und Deutsch
+# Die englische Bewertung wird beim Generieren angezeigt, die deutsche läuft gleichzeitig im Hintergrund
+executor = ThreadPoolExecutor(max_workers=1)
+german_evaluation = executor.submit(get_player_evaluation_german, player, attributes, data)
+# Keine weiteren Aufgaben; ein abgebrochener Lauf der Seite wartet so nicht auf die Anfrage,
+# die Bewertung wird trotzdem fertig erstellt und im Cache gespeichert
+executor.shutdown(wait=False)
+st.write('🏴󠁧󠁢󠁥󠁮󠁧󠁿')
+with st.container(border=True):
+    try:
+        st.write_stream(stream_player_evaluation(player, attributes, data, language='en'))
+    except Exception as e:
+        print(f"Fehler bei der Spielerbewertung: {e}")
+        st.error('Die Spielerbewertung konnte nicht erstellt werden.')
+st.write('🇩🇪󠁧󠁢󠁥󠁿')
 with st.spinner('Generiere Spielerbewertung...'):
-    st.write('🇩🇪󠁧󠁢󠁥󠁿')
-    evaluation = get_player_evaluation_german(player, attributes, data)
-    st.success(evaluation)
+    try:
+        st.success(german_evaluation.result())
+    except Exception as e:
+        print(f"Fehler bei der Spielerbewertung: {e}")
+        st.error('Die Spielerbewertung konnte nicht erstellt werden.')
 
 # Footer
 st.markdown('---')  # This creates a horizontal line
@@ -9,7 +9,7 @@ inject_ga()
 st.set_page_config(layout="wide")
 
 # Daten laden
-dataframe = helpers.preload_data()
+registry = helpers.preload_data()
 
 # Header with logo and app name placeholder
 st.sidebar.image('images/logo.jpg', use_column_width=True)
@@ -21,15 +21,17 @@ quality = helpers.create_quality_dict()
 
 # Sidebar-Einstellungen
 st.sidebar.header('Spieler suchen:', divider=True)
-selected_league_display = st.sidebar.selectbox('Wettbewerb', options=list(leagues.keys()))
-selected_season_display = st.sidebar.selectbox('Saison', options=list(seasons.keys()))
+# Es können mehrere Wettbewerbe und Saisons gleichzeitig durchsucht werden
+selected_league_displays = st.sidebar.multiselect('Wettbewerb', options=list(leagues.keys()), default=list(leagues.keys())[0])
+selected_season_displays = st.sidebar.multiselect('Saison', options=list(seasons.keys()), default=list(seasons.keys())[0])
 
 # Zugriff auf die tatsächlichen Werte
-selected_league = leagues[selected_league_display]
-selected_season = seasons[selected_season_display]
+selected_leagues = [leagues[league] for league in selected_league_displays]
+selected_seasons = [seasons[season] for season in selected_season_displays]
+# Rückübersetzung für die Anzeige der Treffer
+league_displays = {value: key for key, value in leagues.items()}
+season_displays = {value: key for key, value in seasons.items()}
 
-# Dataframe welcher geladen werden soll
-data = helpers.get_data_by_league_and_season(dataframe, selected_league, selected_season)
 # Formular zur Spielerauswahl in der Seitenleiste
 position = st.sidebar.selectbox('Position', ['Abwehrspieler', 'Außenverteidiger', 'Mittelfeldspieler', 'Flügelspieler', 'Angreifer'])
 # Anzahl der Minuten die ein Spieler mindestens gespielt haben muss
@@ -38,6 +40,10 @@ minutes_played_min = st.sidebar.number_input('Minimale Spielzeit', min_value=0,
 
 # Main content area
 st.markdown('# Spielersuche')
+
+if not selected_leagues or not selected_seasons:
+    st.info('Bitte mindestens einen Wettbewerb und eine Saison auswählen.')
+    st.stop()
 st.markdown('### Wähle maximal 5 Spielerqualitäten aus:')
 
 # Qualitäten auswählen
@@ -60,33 +66,55 @@ if len(qualities) > 0:
     st.markdown('---')  # This creates a horizontal line
 
 # Variablen übergeben aus denen der Spieler gesucht werden sollen
-best_of = helpers.search_player(selected_league, selected_season, position, minutes_played_min, quality_values)
+# Nur die besten 10 Spieler werden sortiert, die vollständige Liste erst für die Tabelle
+best_of = helpers.search_player(selected_leagues, selected_seasons, position, minutes_played_min, quality_values, top_k=10)
 
 # zeilennamen ändern
 top_10_chart_data = best_of.copy()
-best_of.columns = ['Spieler', 'Team', 'Position', 'Minuten gespielt', 'Score']
-# für den ersten Eintrag den Spieler plotten in einem expander
-if len(qualities) > 0:
+best_of.columns = ['Spieler', 'Team', 'Position', 'Minuten gespielt', 'Wettbewerb', 'Saison', 'Score']
+# Stammen alle Treffer aus einem Wettbewerb und einer Saison, teilen ihre Plots dieselbe Verteilung
+shared_distribution = len(best_of[['Wettbewerb', 'Saison']].drop_duplicates()) == 1
+if len(qualities) > 0 and shared_distribution and st.toggle('Alle Spieler in einer Ansicht'):
+    # Alle Treffer in einem Chart, die Verteilung wird nur einmal übertragen
+    player_league = best_of.iloc[0]['Wettbewerb']
+    player_season = best_of.iloc[0]['Saison']
+    selected_quality_display = st.selectbox('Qualität', options=list(quality.keys()))
+    selected_quality = quality[selected_quality_display]
+    spec = helpers.get_players_chart(player_league, player_season, position, selected_quality, best_of['Spieler'].head(10).tolist(), 0,
+                                     league_displays[player_league], season_displays[player_season], selected_quality_display)
+    if spec:
+        st.vega_lite_chart(spec, use_container_width=True)
+elif len(qualities) > 0:
     # Für die ersten 10 Einträge den Spieler plotten in einem expander
     for i in range(min(10, len(best_of))):
-        with st.expander('#' + str(i+1) + ' ' + best_of.iloc[i]['Spieler'] + ' | ' + best_of.iloc[i]['Team'] + ' | ' + str(best_of.iloc[i]['Minuten gespielt']) + ' Minuten gespielt | Score: ' + '{:.2f}'.format(best_of.iloc[i]['Score'])):
+        with st.expander('#' + str(i+1) + ' ' + best_of.iloc[i]['Spieler'] + ' | ' + best_of.iloc[i]['Team'] + ' | ' + league_displays[best_of.iloc[i]['Wettbewerb']] + ' ' + season_displays[best_of.iloc[i]['Saison']] + ' | ' + str(best_of.iloc[i]['Minuten gespielt']) + ' Minuten gespielt | Score: ' + '{:.2f}'.format(best_of.iloc[i]['Score'])):
             player = best_of.iloc[i]['Spieler']
+            player_league = best_of.iloc[i]['Wettbewerb']
+            player_season = best_of.iloc[i]['Saison']
             # Auswahl der Qualität
             selected_quality_display = st.selectbox(best_of.iloc[i]['Spieler'], options=list(quality.keys()), key=i, label_visibility='hidden')
             selected_quality = quality[selected_quality_display]
-            # Variablen übergeben die geplottet werden sollen
-            attributes = helpers.get_attributes_details(selected_quality, position)
-            # Plot erstellen
-            chart = plots.create_player_plot(data, attributes, player, position, selected_league_display, selected_season_display, selected_quality_display)
-            st.altair_chart(chart, use_container_width=True)
+            # Plot aus dem gemeinsamen Chart-Cache, Vergleichsgruppe ist die Position im Wettbewerb und in der Saison des Spielers
+            spec = helpers.get_player_chart(player_league, player_season, position, selected_quality, player, 0,
+                                            league_displays[player_league], season_displays[player_season], selected_quality_display)
+            if spec:
+                st.vega_lite_chart(spec, use_container_width=True)
+            else:
+                st.write(f"No data available for player {player} in position {position}.")
 
 if len(qualities) > 0:
     with st.expander('Alle Spieler in einer CSV-Tabelle anzeigen'):
-        # erste spalte mit den zahlen entfernen in der darstellung
-        st.dataframe(
-            best_of,
-            hide_index=True
-        )
+        # Die vollständige sortierte Liste wird nur auf Anfrage berechnet
+        if st.toggle('Tabelle laden'):
+            all_players = helpers.search_player(selected_leagues, selected_seasons, position, minutes_played_min, quality_values)
+            all_players['league'] = all_players['league'].map(league_displays)
+            all_players['season'] = all_players['season'].map(season_displays)
+            all_players.columns = ['Spieler', 'Team', 'Position', 'Minuten gespielt', 'Wettbewerb', 'Saison', 'Score']
+            # erste spalte mit den zahlen entfernen in der darstellung
+            st.dataframe(
+                all_players,
+                hide_index=True
+            )
 
     st.markdown('---')  # This creates a horizontal line
 
@@ -9,7 +9,7 @@ inject_ga()
 #st.set_page_config(layout="wide")
 
 # Daten laden
-dataframe = helpers.preload_data()
+registry = helpers.preload_data()
 
 # Header with logo and app name placeholder
 st.sidebar.image('images/logo.jpg', use_column_width=True)
@@ -29,7 +29,10 @@ selected_league = leagues[selected_league_display]
 selected_season = seasons[selected_season_display]
 
 # Dataframe welcher geladen werden soll
-data = helpers.get_data_by_league_and_season(dataframe, selected_league, selected_season)
+data = registry.get(selected_league, selected_season)
+if data is None:
+    st.error(f'Für {selected_league_display} {selected_season_display} konnten keine Daten geladen werden. Bitte später erneut versuchen.')
+    st.stop()
 # Teams aus Dataframe laden und Filter für Team
 teams =sorted(data['team_name'].unique())
 # Auswahl in der Sidebar
@@ -42,8 +45,8 @@ selected_quality = quality[selected_quality_display]
 # Anzahl der Minuten die ein Spieler mindestens gespielt haben muss
 minutes_played_min = st.sidebar.number_input('Minimale Spielzeit', min_value=0, max_value=4200, value=500, step=1)
 
-# Minutenfilter anwenden
-data = data[data['minutes_played'] >= minutes_played_min]
+# Positions- und Minutenfilter über die vorberechnete Partition anwenden
+data = helpers.get_position_data(selected_league, selected_season, position, minutes_played_min)
 
 # Main content area
 st.header('Bewertung von ' + team + ' - ' + selected_quality_display, divider=True)
@@ -51,12 +54,25 @@ st.header('Bewertung von ' + team + ' - ' + selected_quality_display, divider=Tr
 # Variablen übergeben die geplottet werden sollen
 attributes = helpers.get_attributes_details(selected_quality, position)
 
+# Ränge innerhalb der Spieler der Position mit genügend Spielminuten
+rank_table = helpers.get_ranks(selected_league, selected_season, position, minutes_played_min)
+
 # Plot erstellen
-chart = plots.create_teams_plot(data, attributes, team, position, selected_league_display, selected_season_display, selected_quality_display)
+chart = plots.create_teams_plot(data, attributes, team, position, selected_league_display, selected_season_display, selected_quality_display, rank_table)
 st.altair_chart(chart, use_container_width=True)
 
-# Expander mit Spieler aus dem Team nur, wenn Spieler aus dem Team mit den Filtern vorhanden sind
-helpers.display_team_players(data, team, position, quality, selected_league_display, selected_season_display)
+# Alle Spieler des Teams in einem Chart mit gemeinsamer Verteilung oder einzeln in Expandern mit Spielerbewertung
+if st.toggle('Alle Spieler des Teams in einer Ansicht'):
+    spec = helpers.get_team_players_chart(selected_league, selected_season, position, selected_quality, team, minutes_played_min,
+                                          selected_league_display, selected_season_display, selected_quality_display)
+    if spec:
+        st.vega_lite_chart(spec, use_container_width=True)
+    else:
+        st.info(f"Keine Spieler gefunden für '{team}' mit der Position '{position}' und der eingestellten Anzahl an gespielten Minuten.")
+else:
+    # Expander mit Spieler aus dem Team nur, wenn Spieler aus dem Team mit den Filtern vorhanden sind
+    helpers.display_team_players(data, team, position, quality, selected_league_display, selected_season_display,
+                                 selected_league, selected_season, minutes_played_min)
 
 # # Noch ein Plot mit einem Attribut als Beispiel
 # attributes = get_attributes_details('hold_up_play_z')
@@ -9,7 +9,7 @@ from matplotlib import pyplot as plt, patches
 import utils.helpers as helpers
 import utils.plots as plots
 from utils.passwords import inject_ga
-from utils import get_data
+from utils import action_cube, get_data
 
 inject_ga()
 
@@ -46,18 +46,10 @@ actiontypes_df = helpers.create_actiontypes_dataframe()
 results_df = helpers.create_results_dataframe()
 bodyparts_df = helpers.create_bodyparts_dataframe()
 
-# Main DataFrame
-data = get_data.get_data_league(selected_league, selected_season)
-
 # Get list of all teams
-all_teams = ['All'] + sorted(data['team_name'].unique())
+all_teams = ['All'] + get_data.get_teams(selected_league, selected_season)
 selected_teams = st.sidebar.multiselect('Team', options=all_teams, default='All')
 
-# Merge DataFrames with main DataFrame
-data = pd.merge(data, actiontypes_df, on='type_id', how='left')
-data = pd.merge(data, results_df, on='result_id', how='left')
-data = pd.merge(data, bodyparts_df, on='bodypart_id', how='left')
-
 # Retrieve and process player games data
 player_games = get_data.get_player_games(selected_league, selected_season)
 player_games = get_data.process_player_data(player_games)
@@ -66,13 +58,8 @@ player_games = get_data.process_player_data(player_games)
 today = datetime.today().date()
 team_colors = helpers.create_team_colors()
 
-# Calculate VAEP Ratings and normalize for minutes played
-vaep_ratings = get_data.calculate_vaep_ratings(data, player_games)
-stats = vaep_ratings[0]
-mp = vaep_ratings[1]
-
 # Slider for selecting a range of minutes played
-max_minutes_played = stats['minutes_played'].max()
+max_minutes_played = int(player_games['minutes_played'].max())
 values_minutes_played = st.sidebar.slider(
     'Select a range of minutes played',
     0,
@@ -81,9 +68,7 @@ values_minutes_played = st.sidebar.slider(
 )
 
 # Multiselect for positions, action types, and body parts with an 'All' option
-all_positions = ['All'] + sorted(stats['most_common_position'].unique())
-all_actiontypes = ['All'] + sorted(stats['actiontype_name'].unique())
-all_bodyparts = ['All'] + sorted(stats['bodypart_name'].unique())
+all_positions = ['All'] + sorted(player_games['most_common_position'].unique())
 
 selected_positions = st.sidebar.multiselect('Positions', options=all_positions, default='All')
 selected_actiontype_labels = st.sidebar.multiselect('Actiontypes', options=actiontype_labels, default='All')
@@ -105,76 +90,53 @@ if 'All' in selected_positions or not selected_positions:
 if 'All' in selected_teams or not selected_teams:
     selected_teams = all_teams[1:]
 
-# Vordefinierte Zonen
-zones = {
-    'Strafraum': {'min_x': 88.5, 'max_x': 105, 'min_y': 13.84, 'max_y': 54.16},
-    'Mittelfeld': {'min_x': 35, 'max_x': 70, 'min_y': 0, 'max_y': 68},
-    'Rechter Flügel': {'min_x': 0, 'max_x': 105, 'min_y': 0, 'max_y': 22.7},
-    'Linker Flügel': {'min_x': 0, 'max_x': 105, 'min_y': 45.3, 'max_y': 68},
-    'Zentrum': {'min_x': 0, 'max_x': 105, 'min_y': 22.7, 'max_y': 45.3},
-    'Gegnerische Hälfte': {'min_x': 52.5, 'max_x': 105, 'min_y': 0, 'max_y': 68},
-    'Eigene Hälfte': {'min_x': 0, 'max_x': 52.5, 'min_y': 0, 'max_y': 68}
-}
+# Vordefinierte und eigene Zonen
+custom_zones = st.session_state.setdefault('custom_zones', {})
+zones = {**action_cube.ZONES, **custom_zones}
 
 # Positionsfilter in der Sidebar
 st.sidebar.markdown("### Positionsfilter")
+with st.sidebar.expander('Eigene Zone anlegen'):
+    custom_zone_name = st.text_input('Name der Zone')
+    custom_min_x, custom_max_x = st.slider('x-Bereich', 0.0, 105.0, (0.0, 105.0))
+    custom_min_y, custom_max_y = st.slider('y-Bereich', 0.0, 68.0, (0.0, 68.0))
+    if st.button('Zone hinzufügen') and custom_zone_name and custom_zone_name not in zones:
+        custom_zones[custom_zone_name] = {'min_x': custom_min_x, 'max_x': custom_max_x,
+                                          'min_y': custom_min_y, 'max_y': custom_max_y}
+        zones[custom_zone_name] = custom_zones[custom_zone_name]
 zone_options = list(zones.keys())
 selected_zones = st.sidebar.multiselect('Zonen auswählen', options=zone_options, default=[])
 
-# Filter data based on selections
-filtered_stats = stats[
-    (stats['minutes_played'] >= values_minutes_played[0]) &
-    (stats['minutes_played'] <= values_minutes_played[1]) &
-    (stats['team_name'].isin(selected_teams)) &
-    (stats['most_common_position'].isin(selected_positions)) &
-    (stats['actiontype_name'].isin(selected_actiontypes)) &
-    (stats['bodypart_name'].isin(selected_bodyparts))
-    ]
-
-# Positionsfilter anwenden
-if selected_zones:
-    zone_filters = []
-    for zone_name in selected_zones:
-        zone = zones[zone_name]
-        zone_filter = (
-                (filtered_stats['start_x'] >= zone['min_x']) &
-                (filtered_stats['start_x'] <= zone['max_x']) &
-                (filtered_stats['start_y'] >= zone['min_y']) &
-                (filtered_stats['start_y'] <= zone['max_y'])
-        )
-        zone_filters.append(zone_filter)
-
-    # Kombinieren der Filter für die ausgewählten Zonen
-    combined_zone_filter = zone_filters[0]
-    for zf in zone_filters[1:]:
-        combined_zone_filter |= zf  # Logisches OR
-
-    # Anwenden des kombinierten Zonenfilters
-    filtered_stats = filtered_stats[combined_zone_filter]
+# "All" wird nicht als Filter übergeben
+type_ids = (
+    None if "All" in selected_actiontype_labels
+    else actiontypes_df.loc[actiontypes_df['actiontype_name'].isin(selected_actiontypes), 'type_id'].tolist()
+)
+bodypart_ids = (
+    None if "All" in selected_bodypart_labels
+    else bodyparts_df.loc[bodyparts_df['bodypart_name'].isin(selected_bodyparts), 'bodypart_id'].tolist()
+)
+
+if any(zone_name in custom_zones for zone_name in selected_zones):
+    # Eigene Zonen sind nicht im Würfel enthalten: Würfel nur für die Aktionen in den ausgewählten Zonen
+    cube = get_data.get_zone_cube(selected_league, selected_season, [zones[zone_name] for zone_name in selected_zones])
+    cube_zone_names = None
 else:
-    # Keine Zonen ausgewählt, alle Events einbeziehen
-    pass  # Kein Positionsfilter wird angewendet
-
-# Pivot table for risk calculations
-df_risk_filtered = pd.pivot_table(
-    filtered_stats,
-    values='vaep_value',
-    index=['player_name'],
-    columns=['result_name'],
-    aggfunc=np.sum,
-    fill_value=0
-).reset_index()
-
-# Ensure 'success' and 'fail' columns exist
-for result in ['success', 'fail']:
-    if result not in df_risk_filtered.columns:
-        df_risk_filtered[result] = 0
-
-# Merge with minutes played and normalize per 90 minutes
-df_risk_filtered = pd.merge(df_risk_filtered, mp, on=['player_name'])
-for result in ['success', 'fail']:
-    df_risk_filtered[result] = df_risk_filtered[result] / df_risk_filtered['minutes_played'] * 90
-df_risk_filtered.drop(columns=['minutes_played'], inplace=True)
+    # Filter auf den vorberechneten Aggregatwürfel anwenden statt auf die einzelnen Aktionen
+    cube = get_data.get_action_cube(selected_league, selected_season)
+    cube_zone_names = selected_zones
+
+grouped_filtered_stats = action_cube.query_action_cube(
+    cube,
+    player_games,
+    results_df,
+    teams=None if len(selected_teams) == len(all_teams) - 1 else selected_teams,
+    type_ids=type_ids,
+    bodypart_ids=bodypart_ids,
+    zone_names=cube_zone_names,
+    minutes_range=values_minutes_played,
+    positions=selected_positions,
+)
 
 # Main content area
 st.header(f'VAEP stats for {selected_league_display} {selected_season_display}', divider=True)
@@ -185,25 +147,11 @@ If you want to see the players of a specific team, select the team in the sideba
 Everything that follows is based on your filtered data.
 ''')
 
-# Group and aggregate filtered stats
-grouped_filtered_stats = filtered_stats.groupby('player_name').agg({
-    'minutes_played': 'first',
-    'team_name': 'first',
-    'vaep_rating': 'sum',
-    'offensive_rating': 'sum',
-    'defensive_rating': 'sum',
-    'vaep_value': 'sum',
-    'offensive_value': 'sum',
-    'defensive_value': 'sum'
-}).reset_index()
-
-grouped_filtered_stats = pd.merge(grouped_filtered_stats, df_risk_filtered, on=['player_name'])
-
 # Sort by VAEP rating
 sorted_filtered_stats = grouped_filtered_stats.sort_values(by='vaep_rating', ascending=False)
 
 # Display columns in the DataFrame
-columns_to_exclude = ["fail", "offside", "owngoal", "success"]
+columns_to_exclude = ["fail", "offside", "owngoal", "success", "count"]
 dataframe_table = sorted_filtered_stats.drop(columns=[col for col in columns_to_exclude if col in sorted_filtered_stats.columns])
 
 # Display DataFrame and explanations
@@ -305,29 +253,12 @@ The higher the circle, the more valuable the player's average action.
 The further to the right the circle, the more actions per 90 minutes the player performs.
 ''')
 
-# Calculate average actions per 90 minutes
-action_counts = filtered_stats['player_name'].value_counts()
-minutes_played = stats.groupby('player_name')['minutes_played'].first()
-avg_actions_per_90 = (action_counts / minutes_played) * 90
-
-# Calculate average VAEP rating per player
-avg_vaep_rating = filtered_stats.groupby('player_name')['vaep_rating'].mean()
-team_to_player = filtered_stats.groupby('player_name')['team_name'].first()
-
-# Ensure all Series have the same index
-common_index = avg_vaep_rating.index.intersection(avg_actions_per_90.index).intersection(team_to_player.index)
-
-# Reindex the Series to the common index
-avg_vaep_rating = avg_vaep_rating.loc[common_index]
-avg_actions_per_90 = avg_actions_per_90.loc[common_index]
-team_to_player = team_to_player.loc[common_index]
-
-# Prepare scatter plot data
+# Calculate average actions per 90 minutes and average VAEP rating per action from the aggregated values
 scatter_data = pd.DataFrame({
-    'player_name': common_index,
-    'avg_actions_per_90': avg_actions_per_90.values,
-    'avg_vaep_rating': avg_vaep_rating.values,
-    'team_name': team_to_player.values
+    'player_name': grouped_filtered_stats['player_name'],
+    'avg_actions_per_90': grouped_filtered_stats['count'] / grouped_filtered_stats['minutes_played'] * 90,
+    'avg_vaep_rating': grouped_filtered_stats['vaep_rating'] / grouped_filtered_stats['count'],
+    'team_name': grouped_filtered_stats['team_name']
 })
 
 # Selection for interactivity
@@ -342,7 +273,7 @@ horizontal_line = alt.Chart(pd.DataFrame({'y': [avg_y]})).mark_rule(strokeDash=[
 vertical_line = alt.Chart(pd.DataFrame({'x': [avg_x]})).mark_rule(strokeDash=[5, 5], color='grey').encode(x='x:Q')
 
 # Team colors
-unique_teams = sorted(data['team_name'].unique())
+unique_teams = all_teams[1:]
 team_colors = helpers.create_team_colors()
 team_color_range = [team_colors[team] for team in unique_teams if team in team_colors]
 
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+
+# Vordefinierte Zonen
+ZONES = {
+    'Strafraum': {'min_x': 88.5, 'max_x': 105, 'min_y': 13.84, 'max_y': 54.16},
+    'Mittelfeld': {'min_x': 35, 'max_x': 70, 'min_y': 0, 'max_y': 68},
+    'Rechter Flügel': {'min_x': 0, 'max_x': 105, 'min_y': 0, 'max_y': 22.7},
+    'Linker Flügel': {'min_x': 0, 'max_x': 105, 'min_y': 45.3, 'max_y': 68},
+    'Zentrum': {'min_x': 0, 'max_x': 105, 'min_y': 22.7, 'max_y': 45.3},
+    'Gegnerische Hälfte': {'min_x': 52.5, 'max_x': 105, 'min_y': 0, 'max_y': 68},
+    'Eigene Hälfte': {'min_x': 0, 'max_x': 52.5, 'min_y': 0, 'max_y': 68}
+}
+
+# Schlüssel und aufsummierte Werte des Würfels
+CUBE_KEYS = ['player_name', 'team_name', 'type_id', 'bodypart_id', 'result_id', 'zone_mask']
+VALUE_COLUMNS = ['vaep_value', 'offensive_value', 'defensive_value']
+
+# Spalten, die zum Aufbau des Würfels aus den Aktionen geladen werden
+SOURCE_COLUMNS = ['player_name', 'team_name', 'type_id', 'bodypart_id', 'result_id', 'zone_mask'] + VALUE_COLUMNS
+
+
+def _inside(start_x: np.ndarray, start_y: np.ndarray, zone: dict) -> np.ndarray:
+    return ((start_x >= zone['min_x']) & (start_x <= zone['max_x']) &
+            (start_y >= zone['min_y']) & (start_y <= zone['max_y']))
+
+
+def _zone_key(zone: dict) -> tuple:
+    return tuple(float(zone[key]) for key in ('min_x', 'max_x', 'min_y', 'max_y'))
+
+
+def zone_mask(start_x: np.ndarray, start_y: np.ndarray) -> np.ndarray:
+    """
+    Computes for every action in which of the predefined zones it starts. Bit i is set if the action
+    starts in the i-th zone of ZONES. Zones overlap, so an action can be in several zones.
+
+    Parameters:
+    start_x (np.ndarray): The x coordinates where the actions start.
+    start_y (np.ndarray): The y coordinates where the actions start.
+
+    Returns:
+    np.ndarray: The zone membership of every action as a bitmask.
+    """
+    start_x = np.asarray(start_x)
+    start_y = np.asarray(start_y)
+    mask = np.zeros(len(start_x), dtype=np.uint8)
+    for bit, zone in enumerate(ZONES.values()):
+        mask[_inside(start_x, start_y, zone)] |= np.uint8(1 << bit)
+    return mask
+
+
+def zone_bits(zone_names: list[str]) -> int:
+    """
+    Returns the bitmask of the given zone names.
+
+    Parameters:
+    zone_names (list[str]): Names of zones in ZONES.
+
+    Returns:
+    int: The bitmask with one bit per selected zone.
+    """
+    names = list(ZONES)
+    bits = 0
+    for zone_name in zone_names:
+        bits |= 1 << names.index(zone_name)
+    return bits
+
+
+class ZoneMask:
+    """
+    Zone membership of the actions of a league and season, one entry per action. The predefined zones
+    are read from the bitmask computed at load time (column zone_mask of the action store), so selecting
+    them is a single vectorised bitwise test. User-defined rectangular zones are not stored: their
+    membership is computed from the start coordinates for each selection, so the shared mask never grows
+    and sessions can define as many zones as they like. Zones are identified by their bounds, so a
+    user-defined zone with the bounds of a predefined zone uses its bit.
+    """
+
+    def __init__(self, start_x: np.ndarray, start_y: np.ndarray, base_mask: np.ndarray | None = None):
+        self._start_x = np.asarray(start_x)
+        self._start_y = np.asarray(start_y)
+        self._mask = np.asarray(base_mask) if base_mask is not None else zone_mask(self._start_x, self._start_y)
+        self._bits = {_zone_key(zone): bit for bit, zone in enumerate(ZONES.values())}
+
+    def select(self, zones: list[dict]) -> np.ndarray:
+        """
+        Returns which actions start in at least one of the given zones.
+
+        Parameters:
+        zones (list[dict]): Zones with min_x, max_x, min_y and max_y.
+
+        Returns:
+        np.ndarray: A boolean array with one entry per action.
+        """
+        bits = 0
+        custom_zones = []
+        for zone in zones:
+            bit = self._bits.get(_zone_key(zone))
+            if bit is None:
+                custom_zones.append(zone)
+            else:
+                bits |= 1 << bit
+        selected = (self._mask & self._mask.dtype.type(bits)) != 0
+        # Eigene Zonen direkt über die Koordinaten prüfen
+        for zone in custom_zones:
+            selected |= _inside(self._start_x, self._start_y, zone)
+        return selected
+
+
+def build_action_cube(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates the actions of a league and season into a cube keyed by player, team, action type,
+    body part, result and zone membership, holding the sums of the VAEP values and the number of actions.
+    Any combination of the Ranking page filters can then be answered from the cube.
+
+    Parameters:
+    data (pd.DataFrame): The actions with the columns in SOURCE_COLUMNS. Without a zone_mask column,
+        the mask is computed from start_x and start_y.
+
+    Returns:
+    pd.DataFrame: The cube with the columns CUBE_KEYS, VALUE_COLUMNS and count.
+    """
+    if 'zone_mask' not in data.columns:
+        data = data.assign(zone_mask=zone_mask(data['start_x'].to_numpy(), data['start_y'].to_numpy()))
+    cube = data.groupby(CUBE_KEYS, observed=True, sort=False).agg(
+        vaep_value=('vaep_value', 'sum'),
+        offensive_value=('offensive_value', 'sum'),
+        defensive_value=('defensive_value', 'sum'),
+        count=('vaep_value', 'size'),
+    ).reset_index()
+    return cube
+
+
+def query_action_cube(cube: pd.DataFrame, player_minutes: pd.DataFrame, results_df: pd.DataFrame,
+                      teams=None, type_ids=None, bodypart_ids=None, zone_names=None,
+                      minutes_range=None, positions=None) -> pd.DataFrame:
+    """
+    Answers a filter combination of the Ranking page from the cube. A filter that is None is not applied.
+
+    Parameters:
+    cube (pd.DataFrame): The cube from build_action_cube.
+    player_minutes (pd.DataFrame): Minutes played and most common position per player (process_player_data).
+    results_df (pd.DataFrame): The lookup table with result_id and result_name.
+    teams (list[str] | None): The team names to keep.
+    type_ids (list[int] | None): The action type ids to keep.
+    bodypart_ids (list[int] | None): The body part ids to keep.
+    zone_names (list[str] | None): Keep actions that start in at least one of these zones.
+    minutes_range (tuple[int, int] | None): The range of minutes played.
+    positions (list[str] | None): The most common positions to keep.
+
+    Returns:
+    pd.DataFrame: One row per player with minutes played, team, VAEP ratings (per 90 minutes), VAEP values,
+        the VAEP value per result (per 90 minutes, e.g. success and fail) and the number of actions.
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    if teams is not None:
+        mask &= cube['team_name'].isin(teams).to_numpy()
+    if type_ids is not None:
+        mask &= cube['type_id'].isin(type_ids).to_numpy()
+    if bodypart_ids is not None:
+        mask &= cube['bodypart_id'].isin(bodypart_ids).to_numpy()
+    if zone_names:
+        mask &= (cube['zone_mask'].to_numpy() & zone_bits(zone_names)) != 0
+    selected = cube[mask]
+
+    # Spielerbezogene Filter
+    players = player_minutes[['player_name', 'minutes_played', 'most_common_position']]
+    if minutes_range is not None:
+        players = players[players['minutes_played'].between(minutes_range[0], minutes_range[1])]
+    if positions is not None:
+        players = players[players['most_common_position'].isin(positions)]
+
+    totals = selected.groupby('player_name', observed=True)[VALUE_COLUMNS + ['count']].sum()
+
+    # Team mit den meisten Aktionen des Spielers
+    team_counts = selected.groupby(['player_name', 'team_name'], observed=True)['count'].sum().reset_index()
+    team = team_counts.sort_values('count').drop_duplicates('player_name', keep='last').set_index('player_name')['team_name']
+
+    # VAEP-Wert je Ergebnis (z.B. success und fail)
+    result_names = results_df.drop_duplicates('result_id').set_index('result_id')['result_name']
+    by_result = selected.pivot_table(index='player_name', columns='result_id', values='vaep_value',
+                                     aggfunc='sum', fill_value=0, observed=True)
+    by_result.columns = [result_names.get(result_id, str(result_id)) for result_id in by_result.columns]
+    for result in ['success', 'fail']:
+        if result not in by_result.columns:
+            by_result[result] = 0.0
+
+    ranking = totals.join(team.rename('team_name')).join(by_result).reset_index()
+    ranking['player_name'] = ranking['player_name'].astype(str)
+    ranking['team_name'] = ranking['team_name'].astype(str)
+    ranking = ranking.merge(players, on='player_name')
+
+    # Normalisierung auf 90 Minuten
+    per_90 = 90 / ranking['minutes_played']
+    ranking['vaep_rating'] = ranking['vaep_value'] * per_90
+    ranking['offensive_rating'] = ranking['offensive_value'] * per_90
+    ranking['defensive_rating'] = ranking['defensive_value'] * per_90
+    for result in by_result.columns:
+        ranking[result] = ranking[result] * per_90
+
+    columns = ['player_name', 'minutes_played', 'team_name', 'vaep_rating', 'offensive_rating', 'defensive_rating',
+               'vaep_value', 'offensive_value', 'defensive_value', 'count', 'most_common_position']
+    return ranking[columns + list(by_result.columns)]
@@ -0,0 +1,158 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from utils import action_cube, snapshots
+
+
+# Verzeichnis für die Arrow-IPC-Dateien der Aktionstabellen
+STORE_DIR = Path(os.environ.get('DATENFLANKE_ACTION_STORE_DIR', snapshots.SNAPSHOT_DIR / 'actions'))
+
+# Spalten, die als Dictionary gespeichert werden, damit sich die Namen nicht pro Aktion wiederholen
+DICTIONARY_COLUMNS = ['player_name', 'team_name']
+
+# Spalten mit kleinen Kennungen bzw. Gleitkommawerten für das kompakte Format
+CODE_COLUMNS = ['type_id', 'result_id', 'bodypart_id', 'period_id']
+FLOAT_COLUMNS = ['time_seconds', 'start_x', 'end_x', 'start_y', 'end_y',
+                 'vaep_value', 'offensive_value', 'defensive_value']
+
+# Erhöhen, wenn sich das Format der Dateien ändert, damit alte Dateien neu geschrieben werden
+STORE_FORMAT = '2'
+
+_VERSION_KEY = b'datenflanke_version'
+
+
+def store_path(table: str, compact: bool = False) -> Path:
+    """
+    Returns the path of the Arrow IPC file for a table.
+
+    Parameters:
+    table (str): The name of the table.
+    compact (bool): If True, the path of the file in the compact format.
+
+    Returns:
+    Path: The path of the Arrow IPC file.
+    """
+    suffix = '.compact' if compact else ''
+    return STORE_DIR / f"{table}{suffix}.arrow"
+
+
+def compact_actions(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts an actions DataFrame to a compact schema: int8/int16 codes for the id columns,
+    float32 for coordinates and VAEP values and the smallest integer types for the remaining integer columns.
+
+    Parameters:
+    data (pd.DataFrame): The actions.
+
+    Returns:
+    pd.DataFrame: The compacted actions.
+    """
+    data = data.copy()
+    for column in CODE_COLUMNS:
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], downcast='integer')
+    float_columns = [column for column in FLOAT_COLUMNS if column in data.columns]
+    if float_columns:
+        data[float_columns] = data[float_columns].astype('float32')
+    for column in data.select_dtypes(include='integer').columns:
+        data[column] = pd.to_numeric(data[column], downcast='integer')
+    return data
+
+
+def to_arrow(data: pd.DataFrame, compact: bool = False) -> pa.Table:
+    """
+    Converts an actions DataFrame into an Arrow table with dictionary-encoded name columns.
+    The membership of every action in the predefined pitch zones is added as the bitmask column zone_mask.
+
+    Parameters:
+    data (pd.DataFrame): The actions.
+    compact (bool): If True, the compact schema of compact_actions is applied.
+
+    Returns:
+    pa.Table: The Arrow table.
+    """
+    data = compact_actions(data) if compact else data.copy()
+    for column in DICTIONARY_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
+    if 'start_x' in data.columns and 'start_y' in data.columns:
+        data['zone_mask'] = action_cube.zone_mask(data['start_x'].to_numpy(), data['start_y'].to_numpy())
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def open_store(table: str, version: str | None, compact: bool = False) -> pa.Table | None:
+    """
+    Opens the Arrow IPC file of a table as a memory map if it was written for the given version.
+    The returned table references the mapped file, so its buffers are shared through the OS page cache
+    between all sessions and server processes instead of being copied into process memory.
+
+    Parameters:
+    table (str): The name of the table.
+    version (str | None): The current version of the source table.
+    compact (bool): If True, the file in the compact format is opened.
+
+    Returns:
+    pa.Table | None: The memory-mapped table or None if there is no valid file.
+    """
+    path = store_path(table, compact)
+    if version is None or not path.exists():
+        return None
+    try:
+        source = pa.memory_map(str(path), 'r')
+        reader = pa.ipc.open_file(source)
+        metadata = reader.schema.metadata or {}
+        if metadata.get(_VERSION_KEY) != f"{STORE_FORMAT}:{version}".encode():
+            return None
+        return reader.read_all()
+    except Exception as e:
+        print(f"Fehler beim Öffnen des Action Stores {path}: {e}")
+        return None
+
+
+def write_store(table: str, arrow_table: pa.Table, version: str | None, compact: bool = False):
+    """
+    Writes an uncompressed Arrow IPC file for a table, so that it can be memory-mapped without decoding.
+    The file is replaced atomically, so readers in other processes never see a partial file.
+
+    Parameters:
+    table (str): The name of the table.
+    arrow_table (pa.Table): The actions.
+    version (str | None): The version of the source table the data was loaded from.
+    compact (bool): If True, the table is written to the file for the compact format.
+    """
+    if version is None or arrow_table.num_rows == 0:
+        return
+    path = store_path(table, compact)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = {**(arrow_table.schema.metadata or {}),
+                    _VERSION_KEY: f"{STORE_FORMAT}:{version}".encode()}
+        arrow_table = arrow_table.replace_schema_metadata(metadata)
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Fehler beim Schreiben des Action Stores {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def to_pandas(arrow_table: pa.Table, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Returns a DataFrame view on an Arrow table. Numeric columns without missing values reference the
+    Arrow buffers directly, so slicing a memory-mapped table does not copy them.
+
+    Parameters:
+    arrow_table (pa.Table): The actions.
+    columns (list[str] | None): The columns to return. All columns if None.
+
+    Returns:
+    pd.DataFrame: The actions as a DataFrame. The numeric arrays are read-only.
+    """
+    if columns is not None:
+        arrow_table = arrow_table.select(columns)
+    return arrow_table.to_pandas(split_blocks=True)
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+import altair as alt
+
+
+# Obergrenze für den Speicher der serialisierten Chart-Spezifikationen in Megabyte
+CHART_CACHE_MAX_MB = float(os.environ.get('DATENFLANKE_CHART_CACHE_MAX_MB', 64))
+
+
+class ChartCache:
+    """
+    A least recently used cache of serialized Vega-Lite specs of Altair charts, shared by all sessions.
+    The specs are stored as JSON strings; when their total size exceeds max_bytes, the least recently used
+    specs are evicted. Keys should contain the version of the data the chart was built from, so specs of
+    replaced datasets are never returned and age out of the cache.
+    """
+
+    def __init__(self, max_bytes: int = int(CHART_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, build: Callable[[], alt.TopLevelMixin]) -> dict:
+        """
+        Returns the spec of a chart, building and storing it if it is not in the cache.
+
+        Parameters:
+        key (Hashable): The key of the chart.
+        build (Callable[[], alt.TopLevelMixin]): Builds the chart on a miss.
+
+        Returns:
+        dict: The Vega-Lite spec of the chart, e.g. for st.vega_lite_chart.
+        """
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(spec)
+            self.misses += 1
+
+        # Außerhalb des Locks bauen, damit andere Sessions nicht warten müssen
+        spec = build().to_json(indent=None)
+        self._store(key, spec)
+        return json.loads(spec)
+
+    def _store(self, key: Hashable, spec: str):
+        size = len(spec.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.encode())
+            self._entries[key] = spec
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.encode())
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes all specs from the cache. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the number of entries, their size in bytes and the hit, miss and eviction counters.
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self) -> int:
+        return len(self._entries)
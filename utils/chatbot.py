@@ -1,9 +1,273 @@
+import functools
+import os
+import re
+import threading
+from collections.abc import Hashable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
 from openai import OpenAI
 import utils.passwords
 import pandas as pd
 import streamlit as st
+
+from utils import llm_cache
+
 client = OpenAI(api_key=utils.passwords.GPT_KEY)
 
+# Modell für die Spielerbewertungen
+MODEL = "gpt-4o"
+
+# Erhöhen, wenn sich die Prompts ändern, damit zwischengespeicherte Bewertungen nicht mehr verwendet werden
+PROMPT_VERSION = '1'
+
+# Zusätzliche Parameter der Anfragen je Sprache
+COMPLETION_OPTIONS = {
+    'en': {},
+    'de': {'seed': 42, 'temperature': 0.5},
+}
+
+# Persistenter Cache der Bewertungen, gemeinsam für alle Sessions
+cache = llm_cache.LLMCache()
+
+# Maximale Anzahl gleichzeitiger Anfragen an die OpenAI-API
+EVALUATION_MAX_WORKERS = int(os.environ.get('DATENFLANKE_LLM_MAX_WORKERS', 4))
+
+
+# Beispielbewertungen für das Few-Shot-Prompting
+DESCRIPTIONS_PATH = 'Descriptions.xlsx'
+
+# Höchstzahl der Beispielbewertungen pro Anfrage und Tokenbudget für die Beispiele
+FEW_SHOT_MAX_EXAMPLES = int(os.environ.get('DATENFLANKE_FEW_SHOT_MAX_EXAMPLES', 5))
+FEW_SHOT_TOKEN_BUDGET = int(os.environ.get('DATENFLANKE_FEW_SHOT_TOKEN_BUDGET', 2000))
+
+# Geschätzte Größe jeder Anfrage an die API ausgeben (zum Einstellen des Token-Budgets)
+LOG_TOKEN_REPORT = os.environ.get('DATENFLANKE_LOG_TOKEN_REPORT', '0') == '1'
+
+# Attribute in den Beschreibungen der Beispiele, z.B. involvement_z
+_ATTRIBUTE_PATTERN = re.compile(r'\b\w+_z\b')
+
+
+@dataclass(frozen=True, eq=False)
+class FewShotExamples:
+    """
+    The example evaluations of the descriptions file as (user, assistant) pairs.
+
+    Attributes:
+    mtime (float | None): The modification time of the file when it was read, None if there is no file.
+    pairs (tuple[tuple[str, str], ...]): The description of a player and the evaluation written for it.
+    attributes (tuple[frozenset[str], ...]): The attributes mentioned in each description.
+    positions (tuple[str | None, ...]): The position of each example if the file has a position column.
+    """
+    mtime: float | None
+    pairs: tuple[tuple[str, str], ...]
+    attributes: tuple[frozenset[str], ...] = ()
+    positions: tuple[str | None, ...] = ()
+
+
+_examples = None
+_examples_lock = threading.Lock()
+
+
+def load_examples() -> FewShotExamples:
+    """
+    Returns the example evaluations. The file is only read again when its modification time changes,
+    so the examples are not parsed on every evaluation.
+
+    Returns:
+    FewShotExamples: The examples, empty if there is no descriptions file.
+    """
+    global _examples
+    try:
+        mtime = os.path.getmtime(DESCRIPTIONS_PATH)
+    except OSError:
+        mtime = None
+
+    with _examples_lock:
+        if _examples is not None and _examples.mtime == mtime:
+            return _examples
+        # Read in the descriptions up to date to be more detailed and get better answers
+        try:
+            current_df = pd.read_excel(DESCRIPTIONS_PATH)
+            pairs = tuple(zip(current_df['user'].astype(str), current_df['assitant'].astype(str)))
+            if 'position' in current_df.columns:
+                positions = tuple(None if pd.isna(position) else str(position) for position in current_df['position'])
+            else:
+                positions = (None,) * len(pairs)
+        except Exception:
+            pairs = ()
+            positions = ()
+            print("No descriptions file")
+        attributes = tuple(frozenset(_ATTRIBUTE_PATTERN.findall(user)) for user, _ in pairs)
+        _examples = FewShotExamples(mtime, pairs, attributes, positions)
+        return _examples
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text with the rule of thumb of about four characters per token.
+
+    Parameters:
+    text (str): The text.
+
+    Returns:
+    int: The estimated number of tokens.
+    """
+    return (len(text) + 3) // 4
+
+
+def _intro_messages(language: str, position: str) -> tuple[dict, ...]:
+    if language == 'de':
+        return (
+            {"role": "system", "content": f"Du bist ein Fußballscout aus Deutschland \
+            Du lieferst prägnante und auf den Punkt gebrachte Zusammenfassungen von Fußballspielern \
+            basierend auf Daten. Du sprichst und benutzt für den Fußball typische Sprache. \
+            Du nutzt die Informationen aus den dir gegebenen Daten und Antworten \
+            aus früheren 'user/assistant' Paaren, um Zusammenfassungen über die Spieler zu erstellen. \
+            Deine aktuelle Aufgabe besteht darin einen bestimmten Spieler auf der Position {position} zu beschreiben."},
+            {"role": "user", "content": "Was meinst du genau mit Fußball?"},
+            {"role": "assistant", "content": "Ich meine die Sportart Fußball, welche in Europa und in Deutschland die beliebteste und bekannteste Sportart ist.  \
+         "},
+        )
+    else:
+        return (
+            {"role": "system", "content": f"You are a German-based football scout. \
+            You provide succinct and to the point summaries of football players \
+            based on data. You talk in footballing terms about data. \
+            You use the information given to you from the data and answers \
+            to earlier user/assistant pairs to give summaries of players. \
+            Your current job is to assess players in the {position} position."},
+            {"role": "user", "content": "Do you refer to the game you are an \
+         expert in as soccer or football?"},
+            {"role": "assistant", "content": "I refer to the game as football. \
+         When I say football, I don't mean American football, I mean what \
+         Americans call soccer. But I always talk about football, as people \
+         do in the United Kingdom and all the other parts of Europe."},
+        )
+
+
+def _prompt_parts(language: str, attributes) -> tuple[str, str]:
+    if language == 'de':
+        start_prompt ="Hier findest du eine Beschreibung einiger Fähigkeiten des Spielers:\n\n"
+        end_prompt = f"\n Nutze die zur Verfügung stehenden Daten und mache eine Zusammenfassung über den Spieler (nicht mehr als drei Sätze) und spekuliere über die Rolle, welche dieser Spieler in einem Team haben könnte aufgrund dieser Fähigkeiten: {', '.join(attributes)}"
+        return start_prompt, end_prompt
+    else:
+        start_prompt ="Below is a description of some of the player's skills':\n\n"
+        end_prompt = f"\n Use the data provided and summarise the player (using at most four sentences) and speculate on the role the player might take in a team based on these attributes: {', '.join(attributes)}"
+        return start_prompt, end_prompt
+
+
+@functools.lru_cache(maxsize=512)
+def select_examples(language: str, position: str, attributes: tuple[str, ...], examples: FewShotExamples,
+                    max_examples: int = FEW_SHOT_MAX_EXAMPLES, token_budget: int = FEW_SHOT_TOKEN_BUDGET) -> tuple[int, ...]:
+    """
+    Selects the example evaluations that are most relevant for a request: examples of the same position first,
+    then by the share of the requested attributes their description mentions. Examples are added in this order
+    as long as they fit into the token budget, up to max_examples.
+
+    Parameters:
+    language (str): 'en' or 'de'.
+    position (str): The position of the player.
+    attributes (tuple[str, ...]): The attributes the player is evaluated on.
+    examples (FewShotExamples): The examples from load_examples.
+    max_examples (int): The maximum number of examples.
+    token_budget (int): The maximum number of (estimated) tokens of the examples.
+
+    Returns:
+    tuple[int, ...]: The indices of the selected examples in the order of the file.
+    """
+    start_prompt, end_prompt = _prompt_parts(language, attributes)
+    requested = set(attributes)
+
+    def relevance(i):
+        overlap = len(examples.attributes[i] & requested) / len(requested) if requested else 0.0
+        # Die Position hat Vorrang, die Überschneidung der Attribute entscheidet nur innerhalb gleicher Position
+        return (examples.positions[i] == position, overlap)
+
+    # Stabile Sortierung, bei gleicher Relevanz bleibt die Reihenfolge der Datei erhalten
+    candidates = sorted(range(len(examples.pairs)), key=relevance, reverse=True)
+    selected = []
+    used = 0
+    for i in candidates:
+        if len(selected) >= max_examples:
+            break
+        previous_description, answer = examples.pairs[i]
+        tokens = estimate_tokens(start_prompt + previous_description + end_prompt) + estimate_tokens(answer)
+        if used + tokens > token_budget:
+            continue
+        selected.append(i)
+        used += tokens
+    return tuple(sorted(selected))
+
+
+@functools.lru_cache(maxsize=512)
+def message_prefix(language: str, position: str, attributes: tuple[str, ...], examples: FewShotExamples) -> tuple[dict, ...]:
+    """
+    Returns the messages sent before the description of the player: the system prompt, the introduction and
+    the example evaluations selected by select_examples. The prefix is built once per language, position,
+    attributes and version of the examples and shared by all requests, so it must not be modified.
+
+    Parameters:
+    language (str): 'en' or 'de'.
+    position (str): The position of the player.
+    attributes (tuple[str, ...]): The attributes the player is evaluated on.
+    examples (FewShotExamples): The examples from load_examples.
+
+    Returns:
+    tuple[dict, ...]: The messages.
+    """
+    start_prompt, end_prompt = _prompt_parts(language, attributes)
+    messages = list(_intro_messages(language, position))
+    for i in select_examples(language, position, attributes, examples):
+        previous_description, answer = examples.pairs[i]
+        messages.append({"role": "user", "content": start_prompt + previous_description + end_prompt})
+        messages.append({"role": "assistant", "content": answer})
+    return tuple(messages)
+
+
+def token_report(language: str, position: str, attributes: tuple[str, ...], examples: FewShotExamples,
+                 messages: list[dict]) -> dict:
+    """
+    Returns the estimated size of a request.
+
+    Parameters:
+    language (str): 'en' or 'de'.
+    position (str): The position of the player.
+    attributes (tuple[str, ...]): The attributes the player is evaluated on.
+    examples (FewShotExamples): The examples from load_examples.
+    messages (list[dict]): The messages of the request.
+
+    Returns:
+    dict: The number of selected and available examples, the estimated tokens of the selected examples
+        and of the whole request, and the token budget of the examples.
+    """
+    start_prompt, end_prompt = _prompt_parts(language, attributes)
+    selected = select_examples(language, position, attributes, examples)
+    example_tokens = sum(estimate_tokens(start_prompt + examples.pairs[i][0] + end_prompt)
+                         + estimate_tokens(examples.pairs[i][1]) for i in selected)
+    return {
+        'examples': len(selected),
+        'examples_available': len(examples.pairs),
+        'example_tokens': example_tokens,
+        'prompt_tokens': sum(estimate_tokens(message['content']) for message in messages),
+        'token_budget': FEW_SHOT_TOKEN_BUDGET,
+    }
+
+
+def print_token_report(player_name: str, report: dict):
+    """
+    Prints the estimated size of a request from token_report if DATENFLANKE_LOG_TOKEN_REPORT is set to 1.
+
+    Parameters:
+    player_name (str): The name of the player.
+    report (dict): The report from token_report.
+    """
+    if not LOG_TOKEN_REPORT:
+        return
+    print(f"Prompt für {player_name}: {report['examples']} von {report['examples_available']} Beispielen, "
+          f"ca. {report['prompt_tokens']} Tokens, davon {report['example_tokens']} für Beispiele "
+          f"(Budget {report['token_budget']})")
+
 
 # Define the function to describe the player's level
 def describe_level(z_score: float) -> str:
@@ -33,18 +297,8 @@ def describe_level(z_score: float) -> str:
     return description
 
 
-def get_player_evaluation(player_name: str, attributes: list, data: pd.DataFrame) -> str:
-    """
-    Generates an evaluation of a player based on their attributes and data.
-
-    Parameters:
-    player_name (str): The name of the player.
-    attributes (list): A list of attributes to be used for evaluating the player.
-    data (pd.DataFrame): The DataFrame containing the player data.
-
-    Returns:
-    str: A description of the player based on their attributes and data.
-    """
+def _prepare_player_evaluation(player_name: str, attributes: list, data: pd.DataFrame) -> tuple[str, list[dict], dict] | str:
+    # Liefert den Cache-Schlüssel, die Nachrichten an die API und ihre Größe oder eine Fehlermeldung
     try:
         player_data = data[data['player_name'] == player_name].iloc[0]
         position = player_data['position']
@@ -54,65 +308,68 @@ def get_player_evaluation(player_name: str, attributes: list, data: pd.DataFrame
     description = f"Player: {player_name}\n"
 
     player_description = ""
+    levels = []
     for attribute in attributes:
         z_score = player_data.get(attribute, None)
         if z_score is None:
             return f"Attribute {attribute} not found for player {player_name}"
         level = describe_level(z_score)
+        levels.append(level)
         player_description += f"When it comes to {attribute}, {player_name} is {level}.\n"
 
-    messages = [
-        {"role": "system", "content": f"You are a German-based football scout. \
-            You provide succinct and to the point summaries of football players \
-            based on data. You talk in footballing terms about data. \
-            You use the information given to you from the data and answers \
-            to earlier user/assistant pairs to give summaries of players. \
-            Your current job is to assess players in the {position} position."},
-        {"role": "user", "content": "Do you refer to the game you are an \
-         expert in as soccer or football?"},
-        {"role": "assistant", "content": "I refer to the game as football. \
-         When I say football, I don't mean American football, I mean what \
-         Americans call soccer. But I always talk about football, as people \
-         do in the United Kingdom and all the other parts of Europe."}]
+    # Schlüssel für den Cache der Bewertungen, nur aus den diskreten Stufen und nicht aus den genauen Werten,
+    # damit gleiche Profile dieselbe Bewertung erhalten (der Spielername gehört dazu, weil er im Prompt steht)
+    examples = load_examples()
+    cache_key = llm_cache.make_key(language='en', model=MODEL, prompt_version=PROMPT_VERSION, position=position,
+                                   attributes=list(attributes), levels=levels, player=player_name,
+                                   examples=examples.mtime, few_shot=(FEW_SHOT_MAX_EXAMPLES, FEW_SHOT_TOKEN_BUDGET))
 
-    start_prompt ="Below is a description of some of the player's skills':\n\n"
-    end_prompt = f"\n Use the data provided and summarise the player (using at most four sentences) and speculate on the role the player might take in a team based on these attributes: {', '.join(attributes)}"
-    # end_prompt = end_prompt + "\n Your answer should be in german. Take care of using football language in german as well. "
-    #end_prompt = "\n Use the data provided to summarise the player in two sentences."
-    #end_prompt = "\n Explain how the player's involvement in the match is calculated."
-    #end_prompt = "\n Does the player get involved in the game and if not, should we be worried?"
+    # Vorgefertigter Anfang des Prompts mit den Beispielbewertungen, pro Position und Attributen nur einmal gebaut
+    start_prompt, end_prompt = _prompt_parts('en', attributes)
+    prefix = message_prefix('en', position, tuple(attributes), examples)
 
-    # Read in the descriptions up to date to be more detailed and get better answers
-    try:
-        current_df = pd.read_excel('Descriptions.xlsx')
+    #Now ask about current player
 
-        for number_provided,query in current_df.iterrows():
-            previous_description = query['user']
-            the_prompt=start_prompt + previous_description + end_prompt
-            user={"role": "user", "content": the_prompt}
-            messages = messages + [user]
-            assistant={"role": "assistant", "content": query['assitant']}
-            messages = messages + [assistant]
+    the_prompt=start_prompt + player_description + end_prompt
+    messages = [*prefix, {"role": "user", "content": the_prompt}]
 
-    except:
-        current_df = pd.DataFrame()
-        print("No descriptions file")
+    report = token_report('en', position, tuple(attributes), examples, messages)
 
+    return cache_key, messages, report
 
-    #Now ask about current player
 
-    the_prompt=start_prompt + player_description + end_prompt
-    user={"role": "user", "content": the_prompt}
-    messages = messages + [user]
+def get_player_evaluation(player_name: str, attributes: list, data: pd.DataFrame) -> str:
+    """
+    Generates an evaluation of a player based on their attributes and data.
+
+    Parameters:
+    player_name (str): The name of the player.
+    attributes (list): A list of attributes to be used for evaluating the player.
+    data (pd.DataFrame): The DataFrame containing the player data.
 
-    # st.text(messages)
+    Returns:
+    str: A description of the player based on their attributes and data.
+    """
+    prepared = _prepare_player_evaluation(player_name, attributes, data)
+    if isinstance(prepared, str):
+        return prepared
+    cache_key, messages, report = prepared
 
+    # Bewertung aus dem Cache, wenn das gleiche Profil schon bewertet wurde
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    print_token_report(player_name, report)
     response = client.chat.completions.create(
-        model="gpt-4o",  # You can use other models as well
-        messages=messages
+        model=MODEL,  # You can use other models as well
+        messages=messages,
+        **COMPLETION_OPTIONS['en']
     )
 
-    return response.choices[0].message.content
+    evaluation = response.choices[0].message.content
+    cache.set(cache_key, evaluation)
+    return evaluation
 
 
 
@@ -143,18 +400,8 @@ def describe_level_german(z_score: float) -> str:
     return description
 
 
-def get_player_evaluation_german(player_name: str, attributes: list, data: pd.DataFrame) -> str:
-    """
-    Generates an evaluation of a player based on their attributes and data.
-
-    Parameters:
-    player_name (str): The name of the player.
-    attributes (list): A list of attributes to be used for evaluating the player.
-    data (pd.DataFrame): The DataFrame containing the player data.
-
-    Returns:
-    str: A description of the player based on their attributes and data.
-    """
+def _prepare_player_evaluation_german(player_name: str, attributes: list, data: pd.DataFrame) -> tuple[str, list[dict], dict] | str:
+    # Liefert den Cache-Schlüssel, die Nachrichten an die API und ihre Größe oder eine Fehlermeldung
     try:
         player_data = data[data['player_name'] == player_name].iloc[0]
         position = player_data['position']
@@ -164,63 +411,159 @@ def get_player_evaluation_german(player_name: str, attributes: list, data: pd.Da
     description = f"Player: {player_name}\n"
 
     player_description = ""
+    levels = []
     for attribute in attributes:
         z_score = player_data.get(attribute, None)
         if z_score is None:
             return f"Attribute {attribute} not found for player {player_name}"
         level = describe_level_german(z_score)
+        levels.append(level)
         player_description += f"Wenn es um die Fähigkeit {attribute} geht, dann ist {player_name} {level}.\n"
 
-    messages = [
-        {"role": "system", "content": f"Du bist ein Fußballscout aus Deutschland \
-            Du lieferst prägnante und auf den Punkt gebrachte Zusammenfassungen von Fußballspielern \
-            basierend auf Daten. Du sprichst und benutzt für den Fußball typische Sprache. \
-            Du nutzt die Informationen aus den dir gegebenen Daten und Antworten \
-            aus früheren 'user/assistant' Paaren, um Zusammenfassungen über die Spieler zu erstellen. \
-            Deine aktuelle Aufgabe besteht darin einen bestimmten Spieler auf der Position {position} zu beschreiben."},
-        {"role": "user", "content": "Was meinst du genau mit Fußball?"},
-        {"role": "assistant", "content": "Ich meine die Sportart Fußball, welche in Europa und in Deutschland die beliebteste und bekannteste Sportart ist.  \
-         "}]
-
-    start_prompt ="Hier findest du eine Beschreibung einiger Fähigkeiten des Spielers:\n\n"
-    end_prompt = f"\n Nutze die zur Verfügung stehenden Daten und mache eine Zusammenfassung über den Spieler (nicht mehr als drei Sätze) und spekuliere über die Rolle, welche dieser Spieler in einem Team haben könnte aufgrund dieser Fähigkeiten: {', '.join(attributes)}"
-    # end_prompt = end_prompt + "\n Your answer should be in german. Take care of using football language in german as well. "
-    #end_prompt = "\n Use the data provided to summarise the player in two sentences."
-    #end_prompt = "\n Explain how the player's involvement in the match is calculated."
-    #end_prompt = "\n Does the player get involved in the game and if not, should we be worried?"
-
-    # Read in the descriptions up to date to be more detailed and get better answers
-    try:
-        current_df = pd.read_excel('Descriptions.xlsx')
-
-        for number_provided,query in current_df.iterrows():
-            previous_description = query['user']
-            the_prompt=start_prompt + previous_description + end_prompt
-            user={"role": "user", "content": the_prompt}
-            messages = messages + [user]
-            assistant={"role": "assistant", "content": query['assitant']}
-            messages = messages + [assistant]
-
-    except:
-        current_df = pd.DataFrame()
-        print("No descriptions file")
+    # Schlüssel für den Cache der Bewertungen, nur aus den diskreten Stufen und nicht aus den genauen Werten,
+    # damit gleiche Profile dieselbe Bewertung erhalten (der Spielername gehört dazu, weil er im Prompt steht)
+    examples = load_examples()
+    cache_key = llm_cache.make_key(language='de', model=MODEL, prompt_version=PROMPT_VERSION, position=position,
+                                   attributes=list(attributes), levels=levels, player=player_name,
+                                   examples=examples.mtime, few_shot=(FEW_SHOT_MAX_EXAMPLES, FEW_SHOT_TOKEN_BUDGET))
 
+    # Vorgefertigter Anfang des Prompts mit den Beispielbewertungen, pro Position und Attributen nur einmal gebaut
+    start_prompt, end_prompt = _prompt_parts('de', attributes)
+    prefix = message_prefix('de', position, tuple(attributes), examples)
 
     #Now ask about current player
 
     the_prompt=start_prompt + player_description + end_prompt
-    user={"role": "user", "content": the_prompt}
-    messages = messages + [user]
+    messages = [*prefix, {"role": "user", "content": the_prompt}]
+
+    report = token_report('de', position, tuple(attributes), examples, messages)
+
+    return cache_key, messages, report
+
+
+def get_player_evaluation_german(player_name: str, attributes: list, data: pd.DataFrame) -> str:
+    """
+    Generates an evaluation of a player based on their attributes and data.
+
+    Parameters:
+    player_name (str): The name of the player.
+    attributes (list): A list of attributes to be used for evaluating the player.
+    data (pd.DataFrame): The DataFrame containing the player data.
+
+    Returns:
+    str: A description of the player based on their attributes and data.
+    """
+    prepared = _prepare_player_evaluation_german(player_name, attributes, data)
+    if isinstance(prepared, str):
+        return prepared
+    cache_key, messages, report = prepared
 
-    # st.text(messages)
+    # Bewertung aus dem Cache, wenn das gleiche Profil schon bewertet wurde
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    print_token_report(player_name, report)
     response = client.chat.completions.create(
-        model="gpt-4o",  # You can use other models as well
+        model=MODEL,  # You can use other models as well
         messages=messages,
-        seed=42,
-        temperature=0.5
+        **COMPLETION_OPTIONS['de']
     )
 
-    return response.choices[0].message.content
+    evaluation = response.choices[0].message.content
+    cache.set(cache_key, evaluation)
+    return evaluation
 
 
+# Bewertungsfunktionen je Sprache
+EVALUATORS = {
+    'en': get_player_evaluation,
+    'de': get_player_evaluation_german,
+}
+
+# Aufbau der Anfragen je Sprache
+PREPARERS = {
+    'en': _prepare_player_evaluation,
+    'de': _prepare_player_evaluation_german,
+}
+
+
+def stream_player_evaluation(player_name: str, attributes: list, data: pd.DataFrame, language: str = 'en') -> Iterator[str]:
+    """
+    Generates an evaluation of a player like get_player_evaluation, but yields the text piece by piece while
+    the API is still generating it, e.g. for st.write_stream. A cached evaluation is yielded at once as a whole.
+    The complete text is stored in the cache when the stream has finished.
+
+    Parameters:
+    player_name (str): The name of the player.
+    attributes (list): A list of attributes to be used for evaluating the player.
+    data (pd.DataFrame): The DataFrame containing the player data.
+    language (str): 'en' or 'de'.
+
+    Returns:
+    Iterator[str]: The parts of the evaluation.
+    """
+    prepared = PREPARERS[language](player_name, attributes, data)
+    if isinstance(prepared, str):
+        yield prepared
+        return
+    cache_key, messages, report = prepared
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    print_token_report(player_name, report)
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        stream=True,
+        **COMPLETION_OPTIONS[language]
+    )
+    parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if token:
+            parts.append(token)
+            yield token
+
+    # Nur vollständige und nicht leere Bewertungen speichern
+    evaluation = ''.join(parts)
+    if evaluation:
+        cache.set(cache_key, evaluation)
+
+
+def evaluate_players(requests: dict, max_workers: int = EVALUATION_MAX_WORKERS) -> Iterator[tuple[Hashable, str]]:
+    """
+    Generates several player evaluations concurrently, with at most max_workers requests to the API at a time.
+    The evaluations are yielded as soon as they are finished, so a page can show each one when it arrives.
+
+    Parameters:
+    requests (dict): Maps a key to (language, player_name, attributes, data) with language 'en' or 'de'.
+    max_workers (int): The maximum number of concurrent requests.
+
+    Returns:
+    Iterator[tuple[Hashable, str]]: The key and the evaluation of every request in the order they finish.
+    """
+    if not requests:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(requests)))
+    try:
+        futures = {
+            executor.submit(EVALUATORS[language], player_name, attributes, data): key
+            for key, (language, player_name, attributes, data) in requests.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                evaluation = future.result()
+            except Exception as e:
+                print(f"Fehler bei der Spielerbewertung {key}: {e}")
+                evaluation = "Die Spielerbewertung konnte nicht erstellt werden."
+            yield key, evaluation
+    finally:
+        # Wird die Seite neu ausgeführt, nicht auf laufende Anfragen warten und wartende verwerfen
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,8 +1,61 @@
+import os
+import threading
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 import pandas as pd
 from sqlalchemy.sql import text
 
 
+# Einstellungen für den gemeinsamen Connection-Pool, über Umgebungsvariablen anpassbar
+POOL_SIZE = int(os.environ.get('DATENFLANKE_DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.environ.get('DATENFLANKE_DB_MAX_OVERFLOW', 5))
+POOL_RECYCLE = int(os.environ.get('DATENFLANKE_DB_POOL_RECYCLE', 1800))
+POOL_PRE_PING = os.environ.get('DATENFLANKE_DB_POOL_PRE_PING', '1') == '1'
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Tabellenversionen, einmal pro Prozess und Tabelle bestimmt
+_table_versions = {}
+_table_versions_lock = threading.Lock()
+
+
+def engine_options() -> dict:
+    """
+    Returns the pool settings that are passed to create_engine.
+
+    Returns:
+    dict: The keyword arguments for sqlalchemy.create_engine.
+    """
+    return {
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': POOL_PRE_PING,
+    }
+
+
+def get_engine(connection_string: str) -> Engine:
+    """
+    Returns the process-wide engine for a connection string. The engine is created once and then reused.
+
+    Parameters:
+    connection_string (str): The connection string to the SQL database.
+
+    Returns:
+    Engine: The shared SQLAlchemy engine.
+    """
+    engine = _engines.get(connection_string)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(connection_string)
+            if engine is None:
+                engine = create_engine(connection_string, **engine_options())
+                _engines[connection_string] = engine
+    return engine
+
+
 def dataframe_from_sql(league: str, season: str, connection_string: str) -> pd.DataFrame:
     """
     Loads data from a SQL table into a DataFrame.
@@ -15,10 +68,8 @@ def dataframe_from_sql(league: str, season: str, connection_string: str) -> pd.D
     Returns:
     DataFrame: A DataFrame containing the loaded data.
     """
-    engine = create_engine(connection_string, pool_pre_ping=True)
-
-    # Verbindung zur Datenbank herstellen
-    engine = create_engine(connection_string)
+    # Verbindung aus dem gemeinsamen Pool verwenden
+    engine = get_engine(connection_string)
 
     # Table name
     table = f"{league}_{season}_stats_z"
@@ -30,10 +81,100 @@ def dataframe_from_sql(league: str, season: str, connection_string: str) -> pd.D
         FROM {table}
         LEFT JOIN teams ON {table}.team_id = teams.team_id
         """
-        dataframe = pd.DataFrame(engine.connect().execute(text(sql_query)))
+        # Die Verbindung wird nach dem Block wieder an den Pool zurückgegeben
+        with engine.connect() as connection:
+            dataframe = pd.DataFrame(connection.execute(text(sql_query)))
     except Exception as e:
         print(f"Fehler beim Laden der Daten: {e}")
         dataframe = pd.DataFrame()
     return dataframe
 
 
+def _single_table_version(table: str, connection) -> str:
+    # Erste Spalte des Primärschlüssels: ihr Maximum ist ein Zugriff auf das Ende des Index
+    key_query = """
+    SELECT COLUMN_NAME
+    FROM information_schema.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+      AND CONSTRAINT_NAME = 'PRIMARY' AND ORDINAL_POSITION = 1
+    """
+    key_column = connection.execute(text(key_query), {'table': table}).scalar()
+    # Tabellennamen werden von der App selbst gebildet und können nicht als Parameter übergeben werden
+    if key_column is None:
+        row = connection.execute(text(f"SELECT COUNT(*) FROM `{table}`")).one()
+    else:
+        row = connection.execute(text(f"SELECT COUNT(*), MAX(`{key_column}`) FROM `{table}`")).one()
+    return f"{table}@{'/'.join(str(value) for value in row)}"
+
+
+def table_version(tables: str | list[str], engine: Engine) -> str | None:
+    """
+    Returns a version marker for one or more tables, based on their number of rows and the largest value of
+    their primary key. Both are cheap to query (COUNT(*) uses the smallest index, MAX of the leading key column
+    reads the end of the primary key) and, unlike the update time in the information schema, survive a restart
+    of the database server. The marker of each table is computed once per process and shared by all callers,
+    e.g. the action stores and the action cube.
+
+    Parameters:
+    tables (str | list[str]): The name of the table or the names of all tables a query reads from.
+    engine (Engine): The engine of the database.
+
+    Returns:
+    str | None: The version marker or None if it could not be determined for every table.
+    """
+    if isinstance(tables, str):
+        tables = [tables]
+    versions = []
+    try:
+        for table in tables:
+            key = (str(engine.url), table)
+            with _table_versions_lock:
+                version = _table_versions.get(key)
+            if version is None:
+                with engine.connect() as connection:
+                    version = _single_table_version(table, connection)
+                with _table_versions_lock:
+                    version = _table_versions.setdefault(key, version)
+            versions.append(version)
+    except Exception as e:
+        print(f"Fehler beim Abfragen der Tabellenversion von {', '.join(tables)}: {e}")
+        return None
+    return '|'.join(versions)
+
+
+# Spalten, die als Kategorie gespeichert werden, weil sich ihre Werte häufig wiederholen
+CATEGORY_COLUMNS = ['player_name', 'team_name', 'position']
+
+
+def compact_stats_frame(data: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    Converts a stats DataFrame to a compact schema: categoricals for the name and position columns,
+    float32 for the z-scores and the smallest possible integer types for integer columns such as minutes_played.
+
+    Parameters:
+    data (pd.DataFrame): The DataFrame loaded from a stats_z table.
+
+    Returns:
+    tuple: The compacted DataFrame and a report with the memory usage before and after in bytes.
+    """
+    bytes_before = int(data.memory_usage(deep=True).sum())
+    data = data.copy()
+
+    for column in CATEGORY_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
+
+    z_columns = [column for column in data.columns if column.endswith('_z') and pd.api.types.is_float_dtype(data[column])]
+    if z_columns:
+        data[z_columns] = data[z_columns].astype('float32')
+
+    for column in data.select_dtypes(include='integer').columns:
+        data[column] = pd.to_numeric(data[column], downcast='integer')
+
+    bytes_after = int(data.memory_usage(deep=True).sum())
+    report = {
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_saved': bytes_before - bytes_after,
+    }
+    return data, report
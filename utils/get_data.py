@@ -1,18 +1,24 @@
 from collections import Counter
+import os
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 import streamlit as st
+from sqlalchemy.sql import text
+import utils.database as database
+from utils import action_cube, action_store
 from utils.helpers import *
 
 
 @st.cache_resource
 def db_connection():
-    # Verbindung zur Datenbank
-    conn = st.connection('whoscored_db', type='sql')
+    # Verbindung zur Datenbank mit denselben Pool-Einstellungen wie utils.database
+    conn = st.connection('whoscored_db', type='sql', **database.engine_options())
     return conn
 
 
-@st.cache_data
-def get_data_league(league, season):
+@st.cache_resource
+def get_action_table(league, season, compact=False) -> pa.Table:
     # Verbindung
     conn = db_connection()
 
@@ -20,6 +26,13 @@ def get_data_league(league, season):
     actions_table = f"{league}_{season}_actions"
     vaep_table = f"{league}_{season}_vaep"
 
+    # Memory-mapped Datei verwenden, solange sich die Tabellen nicht geändert haben
+    version = database.table_version([actions_table, 'teams', 'players'], conn.engine)
+    table = action_store.open_store(actions_table, version, compact)
+    if table is not None:
+        print("Action store used for", actions_table)
+        return table
+
     # SQL-Query
     sql_query = f"""
                 SELECT ba.game_id, ba.original_event_id, ba.period_id, ba.time_seconds,
@@ -37,9 +50,126 @@ def get_data_league(league, season):
                 INNER JOIN players p ON p.player_id = ba.player_id
                 """
 
-    # Daten abfragen
-    data = conn.query(sql_query)
-    return data
+    # Daten direkt abfragen, ohne zusätzliche Kopie im Cache von conn.query
+    with conn.engine.connect() as connection:
+        data = pd.read_sql(text(sql_query), connection)
+    table = action_store.to_arrow(data, compact)
+    del data
+
+    # Datei schreiben und als Memory Map neu öffnen, damit die Daten nicht im Prozessspeicher bleiben
+    action_store.write_store(actions_table, table, version, compact)
+    mapped_table = action_store.open_store(actions_table, version, compact)
+    return mapped_table if mapped_table is not None else table
+
+
+def get_data_league(league, season, columns=None, compact=False):
+    """
+    Returns the actions of a league and season as a DataFrame view on the shared, memory-mapped Arrow table.
+    The numeric columns reference the mapped buffers and are read-only: writing into them (e.g. data.loc[...] = ...
+    or an in-place operation) raises an error, so callers that modify values must work on data.copy().
+    Adding or replacing whole columns (assign, merge) is fine. player_name and team_name are categorical,
+    so groupby, pivot_table and value_counts on them need observed=True (or dropping zero counts)
+    to avoid empty groups for names of other rows.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    columns (list[str] | None): The columns to return. All columns if None.
+    compact (bool): Use int8/int16 ids, float32 values and downcast integer columns.
+
+    Returns:
+    pd.DataFrame: The actions.
+    """
+    # DataFrame-Ansicht auf die gemeinsame Arrow-Tabelle, numerische Spalten werden nicht kopiert
+    return action_store.to_pandas(get_action_table(league, season, compact), columns)
+
+
+@st.cache_resource
+def get_action_cube(league, season):
+    """
+    Returns the aggregate cube of the actions of a league and season (see utils.action_cube).
+    The cube is built once from the compact action store and saved next to it with the same table version,
+    so it is rebuilt exactly when the underlying tables change.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+
+    Returns:
+    pd.DataFrame: The cube.
+    """
+    conn = db_connection()
+    actions_table = f"{league}_{season}_actions"
+    cube_table = f"{actions_table}_cube"
+
+    version = database.table_version([actions_table, 'teams', 'players'], conn.engine)
+    table = action_store.open_store(cube_table, version)
+    if table is not None:
+        print("Action cube used for", actions_table)
+        return table.to_pandas()
+
+    data = get_data_league(league, season, columns=action_cube.SOURCE_COLUMNS, compact=True)
+    cube = action_cube.build_action_cube(data)
+    action_store.write_store(cube_table, pa.Table.from_pandas(cube, preserve_index=False), version)
+    print("Action cube built for", actions_table)
+    return cube
+
+
+@st.cache_resource
+def get_zone_mask(league, season):
+    """
+    Returns the zone membership of the actions of a league and season, shared by all sessions.
+    It holds only the predefined zones; user-defined zones are computed per selection
+    (see utils.action_cube.ZoneMask).
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+
+    Returns:
+    action_cube.ZoneMask: The zone mask, aligned with get_data_league(league, season, compact=True).
+    """
+    data = get_data_league(league, season, columns=['start_x', 'start_y', 'zone_mask'], compact=True)
+    return action_cube.ZoneMask(data['start_x'].to_numpy(), data['start_y'].to_numpy(), data['zone_mask'].to_numpy())
+
+
+# Wie viele Würfel für Auswahlen mit eigenen Zonen höchstens gespeichert werden
+ZONE_CUBE_MAX_ENTRIES = int(os.environ.get('DATENFLANKE_ZONE_CUBE_MAX_ENTRIES', 16))
+
+ZONE_BOUNDS = ('min_x', 'max_x', 'min_y', 'max_y')
+
+
+@st.cache_resource(max_entries=ZONE_CUBE_MAX_ENTRIES)
+def _get_zone_cube(league, season, zones):
+    data = get_data_league(league, season, columns=action_cube.SOURCE_COLUMNS, compact=True)
+    zone_filter = get_zone_mask(league, season).select([dict(zip(ZONE_BOUNDS, bounds)) for bounds in zones])
+    return action_cube.build_action_cube(data[zone_filter])
+
+
+def get_zone_cube(league, season, zones):
+    """
+    Returns the action cube of the actions that start in at least one of the given zones, e.g. for a
+    selection with user-defined zones, which the cube of get_action_cube does not contain. The cubes are
+    shared by all sessions; only the most recently used ZONE_CUBE_MAX_ENTRIES selections are kept.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    zones (list[dict]): Zones with min_x, max_x, min_y and max_y.
+
+    Returns:
+    pd.DataFrame: The cube of the selected actions.
+    """
+    # Zonen über ihre Grenzen identifizieren, damit dieselbe Auswahl unter anderem Namen denselben Würfel trifft
+    zone_keys = tuple(sorted({tuple(float(zone[key]) for key in ZONE_BOUNDS) for zone in zones}))
+    return _get_zone_cube(league, season, zone_keys)
+
+
+@st.cache_data
+def get_teams(league, season):
+    # Teams aus dem bereits geladenen Aktionswürfel statt einer eigenen Abfrage über alle Aktionen
+    cube = get_action_cube(league, season)
+    return sorted(str(team) for team in cube['team_name'].unique())
 
 
 @st.cache_data
@@ -61,18 +191,6 @@ def get_games(league, season):
     return games
 
 
-@st.cache_data
-def join_data_with_games(data, games):
-    # Stelle sicher, dass 'game_id' in beiden DataFrames vorhanden ist
-    if 'game_id' in data.columns and 'game_id' in games.columns:
-        # Verknüpfen der DataFrames
-        merged_data = pd.merge(data, games, on='game_id', how='left')
-        return merged_data
-    else:
-        print("Fehler: 'game_id' ist nicht in beiden DataFrames vorhanden.")
-        return None
-
-
 @st.cache_data
 def get_player_games(league, season):
     # Verbindung
@@ -116,25 +234,6 @@ def process_player_data(player_games):
     # Zurücksetzen des Index, um player_name als Spalte zu haben
     return grouped.reset_index()
 
-@st.cache_data
-def calculate_vaep_ratings(data, player_games):
-    # Add a count column to data
-    data["count"] = 1
-
-    # Group player_games by player_name and sum minutes_played
-    mp = player_games[["player_name", "minutes_played", "most_common_position"]].groupby(
-        "player_name").sum().reset_index()
-
-    # Merge data with the summed minutes_played
-    stats = data.merge(mp)
-
-    # Calculate VAEP ratings and normalize for minutes played
-    stats["vaep_rating"] = stats.vaep_value * 90 / stats.minutes_played
-    stats["offensive_rating"] = stats.offensive_value * 90 / stats.minutes_played
-    stats["defensive_rating"] = stats.defensive_value * 90 / stats.minutes_played
-
-    return stats, mp
-
 # function preload_data to load all data from the database in cache
 def preload_data():
     # Load all data from the database
@@ -156,12 +255,13 @@ def preload_data():
     seasons = ["2023_2024"]
     for league in leagues:
         for season in seasons:
-            get_data_league(league, season)
+            # Würfel aus dem kompakten Aktionsspeicher, den die Ranking-Seite liest
+            get_action_cube(league, season)
             get_games(league, season)
             get_player_games(league, season)
             print("Data preloaded for", league, season)
 
-    get_data_league('bundesliga', "2024_2025")
+    get_action_cube('bundesliga', "2024_2025")
     get_games('bundesliga', "2024_2025")
     get_player_games('bundesliga', "2024_2025")
 
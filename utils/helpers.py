@@ -1,9 +1,19 @@
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
 import utils.database as db
 import pandas as pd
 import streamlit as st
 
 from utils import chatbot
+from utils import chart_cache, partitions, ranks, scoring, similarity, snapshots
+from utils.labels import create_x_labels, create_y_labels
 from utils.db_connection_string import create_connection_string
+from utils.registry import DatasetRegistry
 import stqdm
 import utils.plots as plots
 
@@ -77,94 +87,6 @@ def describe_level(z_score):
     return description
 
 
-def create_x_labels() -> dict:
-    x_labels = {
-        -1.5: "schlecht",
-        -0.75: "unterdurchschnittlich",
-        0: "durchschnittlich",
-        0.75: "gut",
-        1.25: "sehr gut",
-        1.75: "überragend"
-    }
-    return x_labels
-
-
-def create_y_labels() -> dict:
-    y_labels = {
-        'aerials_won_z': 'Gewonnene Luftzweikämpfe',
-        'aerials_z': 'Luftzweikämpfe',
-        'defensive_actions_z': 'Defensive Aktionen',
-        'touches_z': 'Ballkontakte',
-        'ball_progression_vaep_z': 'Ballprogression VAEP',
-        'ball_progression_count_z': 'Ballprogressionen',
-        'passes_into_final_third_vaep_z': 'Pässe ins letzte Drittel VAEP',
-        'vaep_buildup_z': 'VAEP Spielaufbau',
-        'passes_vaep_z': 'Pässe VAEP',
-        'crosses_vaep_z': 'Flanken VAEP',
-        'passes_into_final_third_count_z': 'Pässe ins letzte Drittel',
-        'passes_in_final_third_count_z': 'Pässe im letzten Drittel',
-        'count_creative_passes_z': 'Kreative Pässe',
-        'assists_z': 'Vorlagen',
-        'second_assists_z': 'Vor-Vorlagen',
-        'vaep_created_with_passes_z': 'VAEP durch Pässe',
-        'deep_completions_z': 'Tiefe Pässe angekommen',
-        'xA_z': 'Assists VAEP',
-        'dribbles_success_z': 'Erfolgreiche Dribblings',
-        'dribbles_vaep_z': 'Dribblings VAEP',
-        'xG_created_with_dribbles_z': 'Erwartete Tore durch Dribblings',
-        'pressure_resistance_z': 'Druckresistenz',
-        'touches_in_box_z': 'Ballkontakte im Strafraum',
-        'box_entries_z': 'Strafraumeintritte',
-        'goals_z': 'Tore',
-        'vaep_shots_z': 'Schüsse VAEP',
-        'penalty_area_receptions_z': 'Ballannahmen im Strafraum',
-        'shot_conversion_z': 'Schussquote',
-        'goals_vaep_z': 'Tore VAEP',
-        'ball_recoveries_z': 'Ballrückeroberungen',
-        'counterpressing_recoveries_z': 'Gegenpressing Rückeroberungen',
-        'interceptions_z': 'Abfangaktionen',
-        'defensive_intensity_z': 'Defensive Intensität',
-        'counterpressing_interceptions_z': 'Gegenpressing Abfangaktionen',
-        'high_turnovers_z': 'Hohe Ballverluste',
-        'vaep_per_shot_z': 'VAEP pro Schuss',
-        'losses_z': 'Ballverluste',
-        'aerials_won_offensive_value_z': 'Off. Wert gewonnener Luftzweikämpfe',
-        'attacking_aerials_won_offensive_value_z': 'Off. VAEP Wert off. Luftzweikämpfe',
-        'attacking_aerials_won_z': 'Off. Luftzweikämpfe',
-        'headed_plays_z': 'Kopfballaktionen',
-        'defensive_aerials_won_z': 'Defensive gewonnene Luftzweikämpfe',
-        'defensive_aerials_won_defensive_value_z': 'Defensiver Wert gewonnener Luftzweikämpfe',
-        'aerials_won_defensive_value_z': 'Defensiver Wert gewonnener Luftzweikämpfe',
-        'tackles_success_z': 'Erfolgreiche Tacklings',
-        'defensive_actions_defensive_value_z': 'Def. Wert def. Aktionen',
-        'possessions_won_z': 'Gewonnene Ballbesitze',
-        'ball_runs_vaep_z': 'Ballläufe VAEP',
-        'deep_runs_vaep_z': 'Tiefe Läufe VAEP',
-        'carries_offensive_value_z': 'Offensiver Wert Dribblings',
-        'xG_z': 'Erwartete Tore',
-        'link_up_plays_attack_z': 'Angriffsverbindungen',
-        'long_ball_receptions_z': 'Lange Ballannahmen',
-        'involvement_z': 'Spielbeteiligung',
-        'progression_z': 'Ballprogression',
-        'composure_z': 'Ruhe am Ball',
-        'aerial_threat_z': 'Offensives Kopfballspiel',
-        'defensive_heading_z': 'Defensives Kopfballspiel',
-        'active_defense_z': 'Aktive Verteidigung',
-        'intelligent_defense_z': 'Intelligente Verteidigung',
-        'passing_quality_z': 'Passqualität',
-        'providing_teammates_z': 'Mannschaftsunterstützung',
-        'box_threat_z': 'Strafraumgefahr',
-        'effectiveness_z': 'Effektivität',
-        'pressing_z': 'Pressing',
-        'run_quality_z': 'Laufqualität',
-        'finishing_z': 'Abschlussqualität',
-        'poaching_z': 'Abstauberqualität',
-        'dribble_z': 'Dribbling',
-        'hold_up_play_z': 'Ballbehauptung'
-    }
-    return y_labels
-
-
 def get_attributes_summary(position) -> list:
     if position == 'Abwehrspieler':
         a = ['involvement_z', 'progression_z', 'composure_z', 'aerial_threat_z', 'defensive_heading_z',
@@ -241,21 +163,82 @@ def get_attributes_list() -> list:
     return sorted(attributes)
 
 
-def get_data_by_league_and_season(preloaded_data_df, league, season):
-    # Filter the dataframe for the given league and season
-    filtered_df = preloaded_data_df[(preloaded_data_df['league'] == league) & (preloaded_data_df['season'] == season)]
+# Anzahl paralleler Datenbankabfragen beim Vorladen, damit MySQL nicht überlastet wird
+PRELOAD_MAX_WORKERS = int(os.environ.get('DATENFLANKE_PRELOAD_WORKERS', 4))
 
-    if not filtered_df.empty:
-        # Assuming there's only one row per league-season combination
-        return filtered_df.iloc[0]['data']
-    else:
-        # Handle case where no data is found for the given league and season
-        print(f"No data found for league: {league}, season: {season}")
-        return None
+# 'lazy': nur EAGER_DATASETS beim Start laden, alles andere bei der ersten Auswahl
+# 'eager': alle Ligen und Saisons beim Start laden
+PRELOAD_MODE = os.environ.get('DATENFLANKE_PRELOAD_MODE', 'lazy')
+
+# Datensätze, die auch im Modus 'lazy' beim Start geladen werden
+EAGER_DATASETS = [
+    ("bundesliga", "2024_2025"),
+    ("premier_league", "2024_2025"),
+    ("laliga", "2024_2025"),
+    ("seria_a", "2024_2025"),
+    ("ligue_1", "2024_2025"),
+]
+
+
+def _load_league_season(league: str, season: str, connection_string: str) -> tuple[pd.DataFrame, dict]:
+    """
+    Loads a single league/season table and converts it to the compact schema.
+    Errors are caught so that one failing table does not abort the preload.
+
+    Parameters:
+    league (str): The league for which data is to be loaded.
+    season (str): The season for which data is to be loaded.
+    connection_string (str): The connection string to the SQL database.
+
+    Returns:
+    tuple: The loaded data (empty if loading failed) and the metadata for the registry
+        (load_seconds, source_version, bytes_saved).
+    """
+    start = time.perf_counter()
+    try:
+        table = f"{league}_{season}_stats_z"
+        version = db.table_version([table, 'teams'], db.get_engine(connection_string))
+        # Lokalen Snapshot verwenden, solange sich die Tabelle nicht geändert hat
+        data = snapshots.cached_table(table, version,
+                                      lambda: db.dataframe_from_sql(league, season, connection_string))
+        data, report = db.compact_stats_frame(data)
+        print(f"{table}: {report['bytes_saved'] / 1e6:.1f} MB durch kompakte Datentypen gespart "
+              f"({report['bytes_before'] / 1e6:.1f} MB -> {report['bytes_after'] / 1e6:.1f} MB)")
+    except Exception as e:
+        print(f"Fehler beim Vorladen von {league} {season}: {e}")
+        version, data, report = None, pd.DataFrame(), {'bytes_saved': 0}
+    metadata = {
+        'load_seconds': time.perf_counter() - start,
+        'source_version': version,
+        'bytes_saved': report['bytes_saved'],
+    }
+    return data, metadata
+
+
+def _put_preloaded(registry: DatasetRegistry, league: str, season: str, data: pd.DataFrame, metadata: dict):
+    # Fehlgeschlagene Ladevorgänge nicht speichern, damit der Datensatz bei der nächsten Auswahl erneut geladen wird
+    if data.empty:
+        print("Data could not be preloaded for", league, season)
+        return
+    registry.put(league, season, data, **metadata)
+    print("Data preloaded for", league, season)
 
 
-@st.cache_data
-def preload_data():
+@st.cache_resource
+def preload_data(mode: str = PRELOAD_MODE, concurrent: bool = True, max_workers: int = PRELOAD_MAX_WORKERS) -> DatasetRegistry:
+    """
+    Creates the registry with the stats tables of all leagues and seasons.
+    The registry is shared between all sessions and is not copied on a rerun.
+
+    Parameters:
+    mode (str): 'lazy' loads only EAGER_DATASETS at startup and every other league/season the first time
+        it is requested. 'eager' loads all leagues and seasons at startup.
+    concurrent (bool): If True, the tables are fetched on a bounded thread pool instead of one after another.
+    max_workers (int): The maximum number of tables fetched at the same time.
+
+    Returns:
+    DatasetRegistry: The registry with one dataset per (league, season).
+    """
     # Load all data from the database
     leagues = [
         "bundesliga",
@@ -277,59 +260,468 @@ def preload_data():
     #seasons = ["2023_2024"]
     #leagues = ["bundesliga"]
 
-    # Initialize an empty list to store the data
-    data_list = []
+    connection_string = create_connection_string()
+    registry = DatasetRegistry(loader=lambda league, season: _load_league_season(league, season, connection_string))
 
-    for season in stqdm.stqdm(seasons):
-        for league in stqdm.stqdm(leagues, leave=False):
-            data = db.dataframe_from_sql(league, season, create_connection_string())
-            data_list.append({'league': league, 'season': season, 'data': data})
-            print("Data preloaded for", league, season)
+    if mode == 'lazy':
+        keys = list(EAGER_DATASETS)
+    else:
+        keys = [(league, season) for season in seasons for league in leagues]
+
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_load_league_season, league, season, connection_string): (league, season)
+                       for league, season in keys}
+            # Fortschritt im Haupt-Thread anzeigen, sobald eine Tabelle fertig ist
+            for future in stqdm.stqdm(as_completed(futures), total=len(futures)):
+                league, season = futures[future]
+                data, metadata = future.result()
+                _put_preloaded(registry, league, season, data, metadata)
+    else:
+        for league, season in stqdm.stqdm(keys):
+            data, metadata = _load_league_season(league, season, connection_string)
+            _put_preloaded(registry, league, season, data, metadata)
 
-    # Create a new dataframe with columns league, season, and data
-    preloaded_data_df = pd.DataFrame(data_list)
+    return registry
 
-    return preloaded_data_df
+def load_datasets(keys: list[tuple[str, str]], max_workers: int = PRELOAD_MAX_WORKERS):
+    """
+    Loads the datasets of several leagues and seasons that are not in the registry yet, concurrently on a bounded
+    thread pool like preload_data and with a progress bar. Datasets that are already loaded are skipped.
+    Must be called from the script thread; the threads only run the loader of the registry.
 
-def search_player(league, season, position, minutes_played_min, quality_values):
-    data = get_data_by_league_and_season(preload_data(), league, season)
-    # Filter the data for the given position and minutes played
-    data = data[(data['position'] == position) & (data['minutes_played'] >= minutes_played_min)]
-    # for every key in quality_value, get the z_score from the data and multiply it with the value from quality_values
-    # create a new column with the sum of all quality values
-    data['quality'] = 0
-    for key in quality_values:
-        data['quality'] += data[key] * quality_values[key] / 5
-    # sort the data by the quality column
-    data = data.sort_values(by='quality', ascending=False)
+    Parameters:
+    keys (list[tuple[str, str]]): The (league, season) keys of the datasets.
+    max_workers (int): The maximum number of tables fetched at the same time.
+    """
+    registry = preload_data()
+    missing = [key for key in dict.fromkeys(keys) if key not in registry]
+    if not missing:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+        futures = [executor.submit(registry.load, league, season) for league, season in missing]
+        # Fortschritt im Haupt-Thread anzeigen, sobald ein Datensatz geladen ist
+        for _ in stqdm.stqdm(as_completed(futures), total=len(futures)):
+            pass
 
-    # dataframe aufbereiten
-    data = data[['player_name', 'team_name', 'position', 'minutes_played', 'quality']]
-    # kein index anzeige
-    data.reset_index(drop=True, inplace=True)
-    # zeilen umbenennen
-    #data.columns = ['Spieler', 'Team', 'Position', 'Minuten gespielt', 'Score']
 
+def get_partitions(league: str, season: str) -> partitions.PositionPartitions | None:
+    """
+    Returns the position partitions of a league and season, built once per dataset.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+
+    Returns:
+    PositionPartitions | None: The partitions or None if no data was found.
+    """
+    return preload_data().derived(league, season, 'partitions', partitions.PositionPartitions)
+
+
+def get_position_data(league: str, season: str, position: str, minutes_played_min: int = 0) -> pd.DataFrame | None:
+    """
+    Returns the players of a league, season and position with at least minutes_played_min minutes played.
+    The result is a slice of the position partition, sorted by minutes played in ascending order.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str): The position.
+    minutes_played_min (int): The minimum number of minutes played.
+
+    Returns:
+    pd.DataFrame | None: The players or None if no data was found.
+    """
+    position_partitions = get_partitions(league, season)
+    if position_partitions is None:
+        return None
+    return position_partitions.get(position, minutes_played_min)
+
+
+def get_ranks(league: str, season: str, position: str | None = None, minutes_played_min: int = 0) -> ranks.RankTable | None:
+    """
+    Returns the ranks of the players of a league and season within their position. Without a minutes filter,
+    the table of the whole dataset is returned. With a minutes filter, only the players of the position
+    with enough minutes are ranked; the table is cached per suffix of the position partition, so thresholds
+    that select the same players share one table.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str | None): The position, required for the minutes filter.
+    minutes_played_min (int): The minimum number of minutes played.
+
+    Returns:
+    RankTable | None: The ranks or None if no data was found.
+    """
+    registry = preload_data()
+    if position is None or minutes_played_min <= 0:
+        return registry.derived(league, season, 'ranks', ranks.RankTable)
+
+    position_partitions = get_partitions(league, season)
+    if position_partitions is None:
+        return None
+    start = position_partitions.start(position, minutes_played_min)
+    if start == 0:
+        return registry.derived(league, season, 'ranks', ranks.RankTable)
+    # Die Version im Schlüssel verhindert, dass eine Tabelle aus den Partitionen eines ersetzten Datensatzes
+    # für den neuen Datensatz verwendet wird
+    return registry.derived(
+        league, season, ('ranks', position, start, get_data_version(league, season)),
+        lambda data: ranks.RankTable(position_partitions.get(position, minutes_played_min))
+    )
+
+
+# Anzahl paralleler Threads für die ligen- und saisonübergreifende Spielersuche.
+# Die Threads rechnen nur mit den bereits geladenen Matrizen und greifen weder auf die Datenbank
+# noch auf Streamlit zu, daher ist die Anzahl nicht an den Verbindungspool gebunden.
+SEARCH_MAX_WORKERS = os.cpu_count() or 4
+
+# Spalten der Ergebnistabelle der Spielersuche
+SEARCH_COLUMNS = scoring.PLAYER_COLUMNS + ['league', 'season', 'quality']
+
+
+def _scoring_input(league, season, position, minutes_played_min):
+    position_partitions = get_partitions(league, season)
+    if position_partitions is None:
+        return None, 0
+
+    # Z-Score-Matrix der Position in der Reihenfolge der Partition (aufsteigend nach Minuten),
+    # wird pro Datensatz und Version nur einmal aufgebaut
+    matrix = preload_data().derived(
+        league, season, ('scoring', position, get_data_version(league, season)),
+        lambda data: scoring.ScoringMatrix(position_partitions.get(position))
+    )
+    # Minutenfilter per binärer Suche: alle Zeilen ab start
+    return matrix, position_partitions.start(position, minutes_played_min)
+
+
+def _score_partition(league, season, matrix, start, quality_values, top_k=None):
+    if matrix is None:
+        return pd.DataFrame(columns=SEARCH_COLUMNS)
+
+    # Gewichteter Score als Matrix-Vektor-Produkt
+    scores = matrix.score(quality_values, slice(start, None))
+    # Nur die besten k Spieler sortieren
+    order = scoring.top_k(scores, top_k)
+
+    # dataframe aufbereiten
+    data = matrix.players.iloc[start + order].reset_index(drop=True)
+    data['league'] = league
+    data['season'] = season
+    data['quality'] = scores[order]
     return data
 
-def display_team_players(data: pd.DataFrame, team: str, position: str, quality: dict, selected_league_display: str, selected_season_display: str):
+
+def _quality_key(row):
+    # Fehlende Scores werden wie bei der Sortierung ans Ende gestellt
+    quality = row['quality']
+    return -np.inf if pd.isna(quality) else quality
+
+
+def search_player(league, season, position, minutes_played_min, quality_values, top_k=None):
+    """
+    Searches the best players of one or more leagues and seasons and a position for the selected qualities.
+    With several leagues or seasons the datasets are resolved on the calling thread, every partition is
+    scored in parallel and the sorted partial results are merged with a heap, so only the top_k rows
+    are materialised.
+
+    Parameters:
+    league (str | Iterable[str]): The league or the leagues to search.
+    season (str | Iterable[str]): The season or the seasons to search.
+    position (str): The position.
+    minutes_played_min (int): The minimum number of minutes played.
+    quality_values (dict): The selected qualities mapped to their importance (1, 3 or 5).
+    top_k (int | None): Return only the k best players. All players if None.
+
+    Returns:
+    pd.DataFrame: The players with the columns player_name, team_name, position, minutes_played, league, season
+        and quality, sorted by quality.
+    """
+    leagues = [league] if isinstance(league, str) else list(league)
+    seasons = [season] if isinstance(season, str) else list(season)
+    keys = [(league, season) for season in seasons for league in leagues]
+
+    # Fehlende Datensätze gleichzeitig über den Pool des Vorladens laden, dann Partitionen und Matrizen
+    # im Skript-Thread auflösen, weil st.cache_resource nicht in Threads ohne ScriptRunContext läuft
+    load_datasets(keys)
+    partitions_to_score = []
+    for key_league, key_season in keys:
+        matrix, start = _scoring_input(key_league, key_season, position, minutes_played_min)
+        partitions_to_score.append((key_league, key_season, matrix, start))
+
+    if len(partitions_to_score) == 1:
+        return _score_partition(*partitions_to_score[0], quality_values, top_k)
+
+    # Nur das Scoring läuft parallel, numpy gibt dabei den GIL frei
+    with ThreadPoolExecutor(max_workers=min(SEARCH_MAX_WORKERS, max(len(keys), 1))) as executor:
+        results = list(executor.map(
+            lambda partition: _score_partition(*partition, quality_values, top_k),
+            partitions_to_score
+        ))
+    results = [result for result in results if not result.empty]
+    if not results:
+        return pd.DataFrame(columns=SEARCH_COLUMNS)
+
+    if top_k is None:
+        data = pd.concat(results, ignore_index=True)
+        return data.sort_values('quality', ascending=False, kind='stable', na_position='last', ignore_index=True)
+
+    # Die absteigend sortierten Teilergebnisse über einen Heap zusammenführen und nach k Zeilen abbrechen
+    merged = heapq.merge(*(result.to_dict('records') for result in results), key=_quality_key, reverse=True)
+    return pd.DataFrame(list(itertools.islice(merged, top_k)), columns=SEARCH_COLUMNS)
+
+# Spalten der Ergebnistabelle der ähnlichen Spieler
+SIMILAR_COLUMNS = similarity.PLAYER_COLUMNS + ['league', 'season', 'distance']
+
+
+def get_similarity_index(league: str, season: str, position: str, detailed: bool = False) -> similarity.NeighbourIndex | None:
+    """
+    Returns the nearest neighbour index of the players of a league, season and position, built once per dataset.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str): The position.
+    detailed (bool): If True, the index covers all attributes (get_attributes_list), otherwise the summary
+        attributes of the position (get_attributes_summary).
+
+    Returns:
+    NeighbourIndex | None: The index or None if no data was found.
+    """
+    position_partitions = get_partitions(league, season)
+    if position_partitions is None:
+        return None
+    columns = get_attributes_list() if detailed else get_attributes_summary(position)
+    return preload_data().derived(
+        league, season, ('similarity', position, detailed, get_data_version(league, season)),
+        lambda data: similarity.NeighbourIndex(position_partitions.get(position), columns)
+    )
+
+
+def _query_similar(league, season, index, vector, n, exclude=None):
+    if index is None or len(index) == 0:
+        return []
+    # Einen Nachbarn mehr abfragen, falls der Spieler selbst enthalten ist
+    distances, rows = index.query(vector, n + 1)
+    data = index.players.iloc[rows[0]].reset_index(drop=True)
+    data['league'] = league
+    data['season'] = season
+    data['distance'] = distances[0]
+    if exclude is not None:
+        data = data[data['player_name'] != exclude]
+    return data.head(n).to_dict('records')
+
+
+def find_similar_players(player: str, league: str, season: str, position: str, n: int = 10,
+                         leagues=None, seasons=None, detailed: bool = False) -> pd.DataFrame:
+    """
+    Finds the players most similar to a player by the euclidean distance of their attribute z-scores.
+    With several leagues or seasons the indexes are resolved on the calling thread, queried in parallel
+    and the sorted partial results are merged with a heap.
+
+    Parameters:
+    player (str): The name of the player.
+    league (str): The league of the player.
+    season (str): The season of the player.
+    position (str): The position.
+    n (int): The number of similar players.
+    leagues (Iterable[str] | None): The leagues to search. Only the league of the player if None.
+    seasons (Iterable[str] | None): The seasons to search. Only the season of the player if None.
+    detailed (bool): If True, all attributes are compared, otherwise the summary attributes of the position.
+
+    Returns:
+    pd.DataFrame: The similar players with the columns player_name, team_name, position, minutes_played, league,
+        season and distance, sorted by distance.
+    """
+    index = get_similarity_index(league, season, position, detailed)
+    rows = index.rows(player) if index is not None else []
+    if len(rows) == 0:
+        return pd.DataFrame(columns=SIMILAR_COLUMNS)
+    vector = index.vectors(rows[:1])
+
+    leagues = [league] if leagues is None else list(leagues)
+    seasons = [season] if seasons is None else list(seasons)
+    keys = [(key_league, key_season) for key_season in seasons for key_league in leagues]
+
+    # Fehlende Datensätze gleichzeitig laden und die Indizes im Skript-Thread auflösen,
+    # parallel werden nur die Abfragen ausgeführt
+    load_datasets(keys)
+    indexes = {key: get_similarity_index(key[0], key[1], position, detailed) for key in keys}
+
+    def query(key):
+        # Der Spieler selbst wird nur in seinem eigenen Datensatz ausgeschlossen
+        exclude = player if key == (league, season) else None
+        return _query_similar(key[0], key[1], indexes[key], vector, n, exclude)
+
+    with ThreadPoolExecutor(max_workers=min(SEARCH_MAX_WORKERS, max(len(keys), 1))) as executor:
+        results = list(executor.map(query, keys))
+
+    merged = heapq.merge(*results, key=lambda row: row['distance'])
+    return pd.DataFrame(list(itertools.islice(merged, n)), columns=SIMILAR_COLUMNS)
+
+
+@st.cache_resource
+def get_chart_cache() -> chart_cache.ChartCache:
+    """
+    Returns the cache of chart specs shared by all sessions.
+    """
+    return chart_cache.ChartCache()
+
+
+def get_data_version(league: str, season: str):
+    """
+    Returns the version of the loaded data of a league and season, used in the keys of derived caches.
+    This is the version of the source table or, if it is unknown, the time the dataset was loaded.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+
+    Returns:
+    The version or None if the dataset is not loaded.
+    """
+    info = preload_data().info(league, season)
+    if info is None:
+        return None
+    return info.source_version or info.loaded_at.isoformat()
+
+
+def get_player_chart(league: str, season: str, position: str, selected_quality: str, player: str,
+                     minutes_played_min: int, league_display: str, season_display: str, quality_display: str) -> dict | None:
+    """
+    Returns the Vega-Lite spec of the player plot (plots.create_player_plot) from the shared chart cache.
+    The spec is built from the players of the position with at least minutes_played_min minutes played.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str): The position.
+    selected_quality (str): The quality, e.g. 'involvement_z'.
+    player (str): The name of the player.
+    minutes_played_min (int): The minimum number of minutes played of the compared players.
+    league_display (str): The league display name.
+    season_display (str): The season display name.
+    quality_display (str): The quality display name.
+
+    Returns:
+    dict | None: The spec for st.vega_lite_chart or None if the player is not among these players.
+    """
+    data = get_position_data(league, season, position, minutes_played_min)
+    # Ohne Daten des Spielers gibt es nichts zu zeichnen
+    if data is None or not (data['player_name'] == player).any():
+        return None
+    key = ('player', league, season, position, selected_quality, player, minutes_played_min,
+           get_data_version(league, season))
+
+    def build():
+        attributes = get_attributes_details(selected_quality, position)
+        rank_table = get_ranks(league, season, position, minutes_played_min)
+        return plots.create_player_plot(data, attributes, player, position, league_display, season_display,
+                                        quality_display, rank_table)
+
+    return get_chart_cache().get(key, build)
+
+
+def get_team_players_chart(league: str, season: str, position: str, selected_quality: str, team: str,
+                           minutes_played_min: int, league_display: str, season_display: str, quality_display: str) -> dict | None:
+    """
+    Returns the Vega-Lite spec of the combined plot of all players of a team (plots.create_team_players_plot)
+    from the shared chart cache.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str): The position.
+    selected_quality (str): The quality, e.g. 'involvement_z'.
+    team (str): The team.
+    minutes_played_min (int): The minimum number of minutes played of the compared players.
+    league_display (str): The league display name.
+    season_display (str): The season display name.
+    quality_display (str): The quality display name.
+
+    Returns:
+    dict | None: The spec for st.vega_lite_chart or None if the team has no players among these players.
+    """
+    data = get_position_data(league, season, position, minutes_played_min)
+    # Ohne Spieler des Teams gibt es nichts zu zeichnen
+    if data is None or not (data['team_name'] == team).any():
+        return None
+    key = ('team_players', league, season, position, selected_quality, team, minutes_played_min,
+           get_data_version(league, season))
+
+    def build():
+        attributes = get_attributes_details(selected_quality, position)
+        rank_table = get_ranks(league, season, position, minutes_played_min)
+        return plots.create_team_players_plot(data, attributes, team, position, league_display, season_display,
+                                              quality_display, rank_table)
+
+    return get_chart_cache().get(key, build)
+
+
+def get_players_chart(league: str, season: str, position: str, selected_quality: str, players: list[str],
+                      minutes_played_min: int, league_display: str, season_display: str, quality_display: str) -> dict | None:
+    """
+    Returns the Vega-Lite spec of the combined plot of several players of a league, season and position
+    (plots.create_players_plot) from the shared chart cache, e.g. for the results of the player search.
+
+    Parameters:
+    league (str): The league.
+    season (str): The season.
+    position (str): The position.
+    selected_quality (str): The quality, e.g. 'involvement_z'.
+    players (list[str]): The names of the players in the order of the plots.
+    minutes_played_min (int): The minimum number of minutes played of the compared players.
+    league_display (str): The league display name.
+    season_display (str): The season display name.
+    quality_display (str): The quality display name.
+
+    Returns:
+    dict | None: The spec for st.vega_lite_chart or None if none of the players is among these players.
+    """
+    data = get_position_data(league, season, position, minutes_played_min)
+    # Ohne Daten der Spieler gibt es nichts zu zeichnen
+    if data is None or not data['player_name'].isin(players).any():
+        return None
+    key = ('players', league, season, position, selected_quality, tuple(players), minutes_played_min,
+           get_data_version(league, season))
+
+    def build():
+        attributes = get_attributes_details(selected_quality, position)
+        rank_table = get_ranks(league, season, position, minutes_played_min)
+        return plots.create_players_plot(data, attributes, players, position, league_display, season_display,
+                                         quality_display, rank_table)
+
+    return get_chart_cache().get(key, build)
+
+
+def display_team_players(data: pd.DataFrame, team: str, position: str, quality: dict, selected_league_display: str, selected_season_display: str,
+                         league: str, season: str, minutes_played_min: int = 0):
     """
     Displays an expander for each player in the specified team and creates a plot for each player.
 
     Parameters:
-    data (pd.DataFrame): The dataset containing player information.
+    data (pd.DataFrame): The dataset containing player information, e.g. the players of the position from get_position_data.
     team (str): The team to highlight.
     position (str): The position to filter players by.
     quality (dict): A dictionary of qualities.
     selected_league_display (str): The league display name.
     selected_season_display (str): The season display name.
+    league (str): The league of data.
+    season (str): The season of data.
+    minutes_played_min (int): The minutes filter applied to data.
     """
-    team_data = data[(data['team_name'] == team) & (data['position'] == position)]
+    # Spieler in der Reihenfolge des Datensatzes anzeigen, nicht nach Minuten sortiert wie in der Partition
+    team_data = data[(data['team_name'] == team) & (data['position'] == position)].sort_index()
 
     if team_data.empty:
         st.info(f"Keine Spieler gefunden für '{team}' mit der Position '{position}' und der eingestellten Anzahl an gespielten Minuten.")
         return
 
+    # Platzhalter für die Bewertungen, die danach gesammelt und gleichzeitig angefragt werden
+    evaluation_placeholders = {}
+    requests = {}
     for i in range(len(team_data)):
         player = team_data.iloc[i]
         with st.expander(f"# {i+1} {player['player_name']} | {player['team_name']} | {player['minutes_played']} Minuten gespielt"):
@@ -338,16 +730,21 @@ def display_team_players(data: pd.DataFrame, team: str, position: str, quality:
             selected_quality = quality[selected_quality_display]
             # Variablen übergeben die geplottet werden sollen
             attributes = get_attributes_details(selected_quality, position)
-            # Plot erstellen
-            chart = plots.create_player_plot(data, attributes, player['player_name'], position, selected_league_display, selected_season_display, selected_quality_display)
-            if chart:
-                st.altair_chart(chart, use_container_width=True)
-                with st.spinner('Schreibe Spielerbewertung...'):
-                    evaluation = chatbot.get_player_evaluation(player['player_name'], attributes, data)
-                    st.success(evaluation)
+            # Plot aus dem gemeinsamen Chart-Cache
+            spec = get_player_chart(league, season, position, selected_quality, player['player_name'], minutes_played_min,
+                                    selected_league_display, selected_season_display, selected_quality_display)
+            if spec:
+                st.vega_lite_chart(spec, use_container_width=True)
+                evaluation_placeholders[i] = st.empty()
+                evaluation_placeholders[i].info('Schreibe Spielerbewertung...')
+                requests[i] = ('en', player['player_name'], attributes, data)
             else:
                 st.write(f"No data available for player {player['player_name']} in position {position}.")
 
+    # Jede Bewertung wird angezeigt, sobald sie fertig ist
+    for i, evaluation in chatbot.evaluate_players(requests):
+        evaluation_placeholders[i].success(evaluation)
+
 def create_team_colors():
     team_colors = {
         'AC Milan': '#FB090B',  # Rot
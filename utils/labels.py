@@ -0,0 +1,86 @@
+def create_x_labels() -> dict:
+    x_labels = {
+        -1.5: "schlecht",
+        -0.75: "unterdurchschnittlich",
+        0: "durchschnittlich",
+        0.75: "gut",
+        1.25: "sehr gut",
+        1.75: "überragend"
+    }
+    return x_labels
+
+
+def create_y_labels() -> dict:
+    y_labels = {
+        'aerials_won_z': 'Gewonnene Luftzweikämpfe',
+        'aerials_z': 'Luftzweikämpfe',
+        'defensive_actions_z': 'Defensive Aktionen',
+        'touches_z': 'Ballkontakte',
+        'ball_progression_vaep_z': 'Ballprogression VAEP',
+        'ball_progression_count_z': 'Ballprogressionen',
+        'passes_into_final_third_vaep_z': 'Pässe ins letzte Drittel VAEP',
+        'vaep_buildup_z': 'VAEP Spielaufbau',
+        'passes_vaep_z': 'Pässe VAEP',
+        'crosses_vaep_z': 'Flanken VAEP',
+        'passes_into_final_third_count_z': 'Pässe ins letzte Drittel',
+        'passes_in_final_third_count_z': 'Pässe im letzten Drittel',
+        'count_creative_passes_z': 'Kreative Pässe',
+        'assists_z': 'Vorlagen',
+        'second_assists_z': 'Vor-Vorlagen',
+        'vaep_created_with_passes_z': 'VAEP durch Pässe',
+        'deep_completions_z': 'Tiefe Pässe angekommen',
+        'xA_z': 'Assists VAEP',
+        'dribbles_success_z': 'Erfolgreiche Dribblings',
+        'dribbles_vaep_z': 'Dribblings VAEP',
+        'xG_created_with_dribbles_z': 'Erwartete Tore durch Dribblings',
+        'pressure_resistance_z': 'Druckresistenz',
+        'touches_in_box_z': 'Ballkontakte im Strafraum',
+        'box_entries_z': 'Strafraumeintritte',
+        'goals_z': 'Tore',
+        'vaep_shots_z': 'Schüsse VAEP',
+        'penalty_area_receptions_z': 'Ballannahmen im Strafraum',
+        'shot_conversion_z': 'Schussquote',
+        'goals_vaep_z': 'Tore VAEP',
+        'ball_recoveries_z': 'Ballrückeroberungen',
+        'counterpressing_recoveries_z': 'Gegenpressing Rückeroberungen',
+        'interceptions_z': 'Abfangaktionen',
+        'defensive_intensity_z': 'Defensive Intensität',
+        'counterpressing_interceptions_z': 'Gegenpressing Abfangaktionen',
+        'high_turnovers_z': 'Hohe Ballverluste',
+        'vaep_per_shot_z': 'VAEP pro Schuss',
+        'losses_z': 'Ballverluste',
+        'aerials_won_offensive_value_z': 'Off. Wert gewonnener Luftzweikämpfe',
+        'attacking_aerials_won_offensive_value_z': 'Off. VAEP Wert off. Luftzweikämpfe',
+        'attacking_aerials_won_z': 'Off. Luftzweikämpfe',
+        'headed_plays_z': 'Kopfballaktionen',
+        'defensive_aerials_won_z': 'Defensive gewonnene Luftzweikämpfe',
+        'defensive_aerials_won_defensive_value_z': 'Defensiver Wert gewonnener Luftzweikämpfe',
+        'aerials_won_defensive_value_z': 'Defensiver Wert gewonnener Luftzweikämpfe',
+        'tackles_success_z': 'Erfolgreiche Tacklings',
+        'defensive_actions_defensive_value_z': 'Def. Wert def. Aktionen',
+        'possessions_won_z': 'Gewonnene Ballbesitze',
+        'ball_runs_vaep_z': 'Ballläufe VAEP',
+        'deep_runs_vaep_z': 'Tiefe Läufe VAEP',
+        'carries_offensive_value_z': 'Offensiver Wert Dribblings',
+        'xG_z': 'Erwartete Tore',
+        'link_up_plays_attack_z': 'Angriffsverbindungen',
+        'long_ball_receptions_z': 'Lange Ballannahmen',
+        'involvement_z': 'Spielbeteiligung',
+        'progression_z': 'Ballprogression',
+        'composure_z': 'Ruhe am Ball',
+        'aerial_threat_z': 'Offensives Kopfballspiel',
+        'defensive_heading_z': 'Defensives Kopfballspiel',
+        'active_defense_z': 'Aktive Verteidigung',
+        'intelligent_defense_z': 'Intelligente Verteidigung',
+        'passing_quality_z': 'Passqualität',
+        'providing_teammates_z': 'Mannschaftsunterstützung',
+        'box_threat_z': 'Strafraumgefahr',
+        'effectiveness_z': 'Effektivität',
+        'pressing_z': 'Pressing',
+        'run_quality_z': 'Laufqualität',
+        'finishing_z': 'Abschlussqualität',
+        'poaching_z': 'Abstauberqualität',
+        'dribble_z': 'Dribbling',
+        'hold_up_play_z': 'Ballbehauptung'
+    }
+    return y_labels
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from utils import snapshots
+
+
+# SQLite-Datei für die zwischengespeicherten Spielerbewertungen
+LLM_CACHE_PATH = Path(os.environ.get('DATENFLANKE_LLM_CACHE_PATH', snapshots.SNAPSHOT_DIR / 'llm_cache.sqlite'))
+
+# Wie lange eine Bewertung gültig ist (Sekunden) und wie viele Bewertungen höchstens gespeichert werden
+LLM_CACHE_TTL = int(os.environ.get('DATENFLANKE_LLM_CACHE_TTL', 30 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('DATENFLANKE_LLM_CACHE_MAX_ENTRIES', 20000))
+
+
+def make_key(**fields) -> str:
+    """
+    Returns a stable key for the fields of a request, e.g. language, model, position, attributes and levels.
+
+    Parameters:
+    fields: The values that determine the prompt. They must be serializable as JSON (or by str).
+
+    Returns:
+    str: The SHA-256 hash of the fields.
+    """
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    A persistent cache of generated texts in a SQLite file, shared by all sessions and server processes and
+    kept across restarts. Entries expire after ttl seconds; if there are more than max_entries entries,
+    the least recently used ones are removed. Errors of the cache are printed and treated as a miss,
+    so a broken cache file never blocks an evaluation.
+    """
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Eine Verbindung pro Zugriff, damit der Cache aus mehreren Threads verwendet werden kann
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                             'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                             'created_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+                conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the cached text for a key.
+
+        Parameters:
+        key (str): The key from make_key.
+
+        Returns:
+        str | None: The text or None if there is no valid entry.
+        """
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute('SELECT value, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if now - created_at > self.ttl:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    return None
+                conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+                return value
+        except sqlite3.Error as e:
+            print(f"Fehler beim Lesen des LLM-Caches {self.path}: {e}")
+            return None
+
+    def set(self, key: str, value: str):
+        """
+        Stores a text and removes expired and, above max_entries, the least recently used entries.
+
+        Parameters:
+        key (str): The key from make_key.
+        value (str): The text.
+        """
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute('INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                             (key, value, now, now))
+                conn.execute('DELETE FROM entries WHERE created_at < ?', (now - self.ttl,))
+                conn.execute('DELETE FROM entries WHERE key IN ('
+                             'SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                             (self.max_entries,))
+        except sqlite3.Error as e:
+            print(f"Fehler beim Schreiben des LLM-Caches {self.path}: {e}")
+
+    def __len__(self) -> int:
+        try:
+            with closing(self._connect()) as conn:
+                return conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Fehler beim Lesen des LLM-Caches {self.path}: {e}")
+            return 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+class PositionPartitions:
+    """
+    The players of one league and season split by position, each partition sorted by minutes played.
+    The position filter is a dictionary lookup and the minimum minutes filter is a binary search,
+    which returns a slice of the partition without copying it.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self._empty = data.iloc[0:0]
+        self._partitions = {}
+        self._minutes = {}
+        for position, group in data.groupby('position', observed=True, sort=False):
+            group = group.sort_values('minutes_played', kind='stable')
+            self._partitions[position] = group
+            self._minutes[position] = group['minutes_played'].to_numpy()
+
+    def positions(self) -> list[str]:
+        """
+        Returns the positions that have at least one player.
+        """
+        return list(self._partitions)
+
+    def start(self, position: str, minutes_played_min: int = 0) -> int:
+        """
+        Returns the first row of the partition with at least minutes_played_min minutes played.
+
+        Parameters:
+        position (str): The position.
+        minutes_played_min (int): The minimum number of minutes played.
+
+        Returns:
+        int: The row in the partition, or the length of the partition if no player qualifies.
+        """
+        minutes = self._minutes.get(position)
+        if minutes is None:
+            return 0
+        return int(np.searchsorted(minutes, minutes_played_min, side='left'))
+
+    def get(self, position: str, minutes_played_min: int = 0) -> pd.DataFrame:
+        """
+        Returns the players of a position with at least minutes_played_min minutes played,
+        sorted by minutes played in ascending order.
+
+        Parameters:
+        position (str): The position.
+        minutes_played_min (int): The minimum number of minutes played.
+
+        Returns:
+        pd.DataFrame: A slice of the partition. It must not be modified.
+        """
+        partition = self._partitions.get(position)
+        if partition is None:
+            return self._empty
+        return partition.iloc[self.start(position, minutes_played_min):]
@@ -1,13 +1,62 @@
 import altair as alt
+import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 from matplotlib.patches import Arc
 import matplotsoccer
 
-import utils.helpers
+import utils.labels
+import utils.ranks
 
 
-def create_player_plot(data: pd.DataFrame, attributes: list[str], player_name: str, position: str, league: str, season: str, quality: str) -> alt.Chart:
+def build_plot_data(position_data: pd.DataFrame, attributes: list[str], rank_table: utils.ranks.RankTable) -> pd.DataFrame:
+    """
+    Builds the long-format data of the distribution plots: one row per player and attribute with the z-score,
+    the label of the attribute and the rank within the position. The rows are ordered by attribute and within
+    an attribute like position_data, so the rows of the i-th player are i, i + n, i + 2n, ... (n players).
+
+    Parameters:
+    position_data (pd.DataFrame): The players of the position.
+    attributes (list[str]): The attributes to plot.
+    rank_table (RankTable): The ranks of the players in position_data.
+
+    Returns:
+    pd.DataFrame: The columns Player, Value, Attribute, Y, Rank, Total and Rank_Display.
+    """
+    y_labels = utils.labels.create_y_labels()
+
+    plot_data = position_data[['player_name'] + attributes].melt(
+        id_vars='player_name', value_vars=attributes, var_name='Attribute', value_name='Value', ignore_index=True
+    ).rename(columns={'player_name': 'Player'})
+    plot_data['Y'] = plot_data['Attribute'].map(y_labels)
+
+    # Ränge spaltenweise in derselben Reihenfolge wie melt auslesen
+    plot_data['Rank'] = rank_table.rank.loc[position_data.index, attributes].to_numpy().ravel(order='F')
+    plot_data['Total'] = np.tile(rank_table.total.loc[position_data.index].to_numpy(), len(attributes))
+    plot_data['Rank_Display'] = (plot_data['Rank'].astype('Int64').astype('string').fillna('-') + '/'
+                                 + plot_data['Total'].astype('string'))
+    return plot_data[['Player', 'Value', 'Attribute', 'Y', 'Rank', 'Total', 'Rank_Display']]
+
+
+def select_plot_rows(plot_data: pd.DataFrame, n_players: int, rows: np.ndarray) -> pd.DataFrame:
+    """
+    Returns the rows of some players from the data of build_plot_data, ordered by attribute and player.
+
+    Parameters:
+    plot_data (pd.DataFrame): The data from build_plot_data.
+    n_players (int): The number of players the data was built from.
+    rows (np.ndarray): The positions of the players in the position data.
+
+    Returns:
+    pd.DataFrame: The rows of the selected players for every attribute.
+    """
+    n_attributes = len(plot_data) // n_players if n_players else 0
+    take = (np.arange(n_attributes)[:, None] * n_players + np.asarray(rows)[None, :]).ravel()
+    return plot_data.iloc[take].reset_index(drop=True)
+
+
+def create_player_plot(data: pd.DataFrame, attributes: list[str], player_name: str, position: str, league: str, season: str, quality: str,
+                       rank_table: utils.ranks.RankTable | None = None) -> alt.Chart:
     """
     Creates a plot for a specific player, comparing their attributes to other players in the same position.
 
@@ -19,33 +68,25 @@ def create_player_plot(data: pd.DataFrame, attributes: list[str], player_name: s
     league (str): The league in which the player plays.
     season (str): The season for which the data is being analyzed.
     quality (str): The quality metric used for player evaluation.
+    rank_table (RankTable | None): The precomputed ranks of the players in data (helpers.get_ranks).
+        Computed from data if None.
 
     Returns:
     alt.Chart: An Altair chart object representing the player plot.
     """
-    x_labels = utils.helpers.create_x_labels()
-    y_labels = utils.helpers.create_y_labels()
+    x_labels = utils.labels.create_x_labels()
 
     # Daten für den ausgewählten Spieler filtern
     player_data = data[(data['player_name'] == player_name) & (data['position'] == position)]
 
     # Daten für alle Spieler auf der gleichen Position filtern
     position_data = data[data['position'] == position]
+    # Ränge aus der vorberechneten Tabelle lesen
+    if rank_table is None:
+        rank_table = utils.ranks.RankTable(position_data)
 
-    # Erstelle einen DataFrame für das Plotten
-    plot_data_list = []
-    for idx, attribute in enumerate(attributes):
-        temp_data = pd.DataFrame({
-            'Player': position_data['player_name'],
-            'Value': position_data[attribute].values.flatten(),  # Sicherstellen, dass die Daten 1-dimensional sind
-            'Attribute': attribute,
-            'Y': y_labels[attribute]  # Y-Wert als benutzerdefiniertes Label zuweisen
-        })
-        temp_data['Rank'] = temp_data['Value'].rank(ascending=False, method='min')
-        temp_data['Total'] = len(temp_data)
-        temp_data['Rank_Display'] = temp_data.apply(lambda row: f"{int(row['Rank'])}/{int(row['Total'])}", axis=1)
-        plot_data_list.append(temp_data)
-    plot_data = pd.concat(plot_data_list)
+    # Daten im Long-Format für alle Attribute auf einmal erstellen
+    plot_data = build_plot_data(position_data, attributes, rank_table)
 
     # Erstelle den Altair-Plot
     base = alt.Chart(plot_data).mark_circle(size=60, opacity=0.5).encode(
@@ -63,22 +104,9 @@ def create_player_plot(data: pd.DataFrame, attributes: list[str], player_name: s
         height=85 * len(attributes)
     )
 
-    # Hervorhebung des ausgewählten Spielers
-    highlight_data_list = []
-    for idx, attribute in enumerate(attributes):
-        temp_data = pd.DataFrame({
-            'Player': [player_name],
-            'Value': [player_data[attribute].values.flatten()[0]],
-            'Attribute': [attribute],
-            'Y': [y_labels[attribute]]
-        })
-        temp_data['Rank'] = \
-            plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player_name)]['Rank'].values[0]
-        temp_data['Total'] = \
-            plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player_name)]['Total'].values[0]
-        temp_data['Rank_Display'] = f"{int(temp_data['Rank'][0])}/{int(temp_data['Total'][0])}"
-        highlight_data_list.append(temp_data)
-    highlight_data = pd.concat(highlight_data_list)
+    # Hervorhebung des ausgewählten Spielers über seine Zeile in den Positionsdaten
+    player_row = position_data.index.get_indexer(player_data.index[:1])
+    highlight_data = select_plot_rows(plot_data, len(position_data), player_row)
 
     highlight = alt.Chart(highlight_data).mark_circle(size=200, color='red').encode(
         x='Value:Q',
@@ -140,12 +168,14 @@ def create_top10_plot(data):
 
     return chart
 
-def create_teams_plot(data, attributes, team, position, selected_league_display, selected_season_display, selected_quality_display):
-    x_labels = utils.helpers.create_x_labels()
-    y_labels = utils.helpers.create_y_labels()
+def create_teams_plot(data, attributes, team, position, selected_league_display, selected_season_display, selected_quality_display, rank_table=None):
+    x_labels = utils.labels.create_x_labels()
 
     # Daten für alle Spieler auf der gleichen Position filtern
     position_data = data[data['position'] == position]
+    # Ränge aus der vorberechneten Tabelle lesen
+    if rank_table is None:
+        rank_table = utils.ranks.RankTable(position_data)
 
     # Daten für alle Spieler im ausgewählten Team filtern
     team_data = data[(data['team_name'] == team) & (data['position'] == position)]
@@ -153,23 +183,8 @@ def create_teams_plot(data, attributes, team, position, selected_league_display,
     if position_data.empty or team_data.empty:
         return alt.Chart(pd.DataFrame({'x': [], 'y': []})).mark_point()
 
-    # Erstelle einen DataFrame für das Plotten
-    plot_data_list = []
-    for idx, attribute in enumerate(attributes):
-        temp_data = pd.DataFrame({
-            'Player': position_data['player_name'],
-            'Value': position_data[attribute].values.flatten(),  # Sicherstellen, dass die Daten 1-dimensional sind
-            'Attribute': attribute,
-            'Y': y_labels[attribute]  # Y-Wert als benutzerdefiniertes Label zuweisen
-        })
-        temp_data['Rank'] = temp_data['Value'].rank(ascending=False, method='min')
-        temp_data['Total'] = len(temp_data)
-
-        if not temp_data.empty:
-            temp_data['Rank_Display'] = temp_data.apply(lambda row: f"{int(row['Rank'])}/{int(row['Total'])}", axis=1)
-
-        plot_data_list.append(temp_data)
-    plot_data = pd.concat(plot_data_list)
+    # Daten im Long-Format für alle Attribute auf einmal erstellen
+    plot_data = build_plot_data(position_data, attributes, rank_table)
 
     # Erstelle den Altair-Plot
     base = alt.Chart(plot_data).mark_circle(size=60, opacity=0.5).encode(
@@ -187,21 +202,10 @@ def create_teams_plot(data, attributes, team, position, selected_league_display,
         height=85 * len(attributes)
     )
 
-    # Hervorhebung der Spieler im ausgewählten Team
-    highlight_data_list = []
-    for idx, attribute in enumerate(attributes):
-        for player in team_data['player_name']:
-            temp_data = pd.DataFrame({
-                'Player': [player],
-                'Value': [team_data[team_data['player_name'] == player][attribute].values.flatten()[0]],
-                'Attribute': [attribute],
-                'Y': [y_labels[attribute]]
-            })
-            temp_data['Rank'] = plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player)]['Rank'].values[0]
-            temp_data['Total'] = plot_data[(plot_data['Attribute'] == attribute) & (plot_data['Player'] == player)]['Total'].values[0]
-            temp_data['Rank_Display'] = f"{int(temp_data['Rank'][0])}/{int(temp_data['Total'][0])}"
-            highlight_data_list.append(temp_data)
-    highlight_data = pd.concat(highlight_data_list)
+    # Hervorhebung der Spieler im ausgewählten Team: ein Join der Teamspieler über den Index
+    # der Positionsdaten statt einer Suche je Spieler und Attribut
+    team_rows = position_data.index.get_indexer(team_data.index)
+    highlight_data = select_plot_rows(plot_data, len(position_data), team_rows)
 
     highlight = alt.Chart(highlight_data).mark_circle(size=200, color='red').encode(
         x='Value:Q',
@@ -218,6 +222,102 @@ def create_teams_plot(data, attributes, team, position, selected_league_display,
 
     return chart
 
+def create_players_plot(data: pd.DataFrame, attributes: list[str], players: list[str], position: str, league: str, season: str, quality: str,
+                        rank_table: utils.ranks.RankTable | None = None) -> alt.Chart:
+    """
+    Creates the player plot of several players of the same position in one chart, stacked vertically in the given
+    order. The distribution of the position is the same in every plot, so its data is built once and embedded once
+    as a shared dataset (Altair consolidates identical data into the datasets of the spec); each plot only adds the
+    highlight points of its player.
+
+    Parameters:
+    data (pd.DataFrame): The dataset containing player information.
+    attributes (List[str]): A list of attributes to be used for evaluating the players.
+    players (List[str]): The names of the players to plot. Players that are not in the position are skipped.
+    position (str): The position of the players.
+    league (str): The league in which the players play.
+    season (str): The season for which the data is being analyzed.
+    quality (str): The quality metric used for player evaluation.
+    rank_table (RankTable | None): The precomputed ranks of the players in data (helpers.get_ranks).
+        Computed from data if None.
+
+    Returns:
+    alt.Chart: An Altair chart object with one plot per player.
+    """
+    x_labels = utils.labels.create_x_labels()
+
+    # Daten für alle Spieler auf der gleichen Position filtern
+    position_data = data[data['position'] == position]
+    if rank_table is None:
+        rank_table = utils.ranks.RankTable(position_data)
+
+    # Zeile jedes Spielers in den Positionsdaten, bei gleichen Namen wie im Spieler-Plot die erste
+    names = position_data['player_name'].to_numpy()
+    player_rows = [np.flatnonzero(names == player)[:1] for player in players]
+    player_rows = [rows for rows in player_rows if len(rows) > 0]
+
+    if position_data.empty or not player_rows:
+        return alt.Chart(pd.DataFrame({'x': [], 'y': []})).mark_point()
+
+    # Die Verteilung wird einmal erstellt und von allen Plots gemeinsam verwendet
+    plot_data = build_plot_data(position_data, attributes, rank_table)
+
+    charts = []
+    for rows in player_rows:
+        player = position_data.iloc[rows[0]]
+        base = alt.Chart(plot_data).mark_circle(size=60, opacity=0.5).encode(
+            x=alt.X('Value:Q', scale=alt.Scale(domain=(-3, 4)),
+                    axis=alt.Axis(title=f"{player['player_name']} im Vergleich zu Spielern mit der Position {position} - {quality}",
+                                  titleY=75, titleAlign='center', values=list(x_labels.keys()),
+                                  labelExpr="datum.value == -1.5 ? 'schlecht' : datum.value == -0.75 ? 'unterdurchschnittlich' : datum.value == 0 ? 'durchschnittlich' : datum.value == 0.75 ? 'gut' : datum.value == 1.25 ? 'sehr gut' : datum.value == 1.75 ? 'überragend' : ''")),
+            y=alt.Y('Y:N', axis=alt.Axis(
+                title=f'{player["player_name"]} - {player["team_name"]} in {player["minutes_played"]} gespielten Minuten. {league} - Saison {season} ',
+                titleAngle=0, titleX=100, titleY=-50, labelAngle=0, labelAlign='right', labelLimit=175)),
+            tooltip=['Player', 'Rank_Display']
+        ).properties(
+            width=700,
+            height=85 * len(attributes)
+        )
+
+        # Hervorhebung des Spielers
+        highlight_data = select_plot_rows(plot_data, len(position_data), rows)
+        highlight = alt.Chart(highlight_data).mark_circle(size=200, color='red').encode(
+            x='Value:Q',
+            y=alt.Y('Y:N', axis=alt.Axis(labels=True)),
+            tooltip=['Player', 'Rank_Display']
+        )
+        charts.append(alt.layer(base, highlight))
+
+    chart = alt.vconcat(*charts, spacing=120).resolve_scale(
+        color='independent'
+    )
+
+    return chart
+
+def create_team_players_plot(data: pd.DataFrame, attributes: list[str], team: str, position: str, league: str, season: str, quality: str,
+                             rank_table: utils.ranks.RankTable | None = None) -> alt.Chart:
+    """
+    Creates the player plot of every player of a team in one chart with a shared distribution (create_players_plot).
+
+    Parameters:
+    data (pd.DataFrame): The dataset containing player information.
+    attributes (List[str]): A list of attributes to be used for evaluating the players.
+    team (str): The team whose players are plotted.
+    position (str): The position of the players.
+    league (str): The league in which the team plays.
+    season (str): The season for which the data is being analyzed.
+    quality (str): The quality metric used for player evaluation.
+    rank_table (RankTable | None): The precomputed ranks of the players in data (helpers.get_ranks).
+        Computed from data if None.
+
+    Returns:
+    alt.Chart: An Altair chart object with one plot per player.
+    """
+    # Spieler des Teams in der Reihenfolge des Datensatzes
+    team_data = data[(data['team_name'] == team) & (data['position'] == position)].sort_index()
+    return create_players_plot(data, attributes, team_data['player_name'].tolist(), position, league, season, quality,
+                               rank_table)
+
 def plot_actions_around(selected_action, all_actions, games, num_actions_before, num_actions_after):
     # Bestimmen des Indexes der ausgewählten Aktion
     action_index = selected_action.name
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+class RankTable:
+    """
+    Rank, percentile and group size of every player for every z-score column, within the players of the
+    same position. All columns are ranked in one grouped pass, so the plots and the chatbot only look up
+    the values of the rows they show. The tables share the index of the data they were built from.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.columns = [column for column in data.columns if column.endswith('_z')]
+        positions = data['position']
+        grouped = data[self.columns].groupby(positions, observed=True, sort=False)
+        # Rang 1 ist der beste Wert, gleiche Werte bekommen den gleichen (kleinsten) Rang
+        self.rank = grouped.rank(ascending=False, method='min')
+        # Anteil der Spieler der Position, die höchstens so gut sind wie der Spieler
+        self.percentile = grouped.rank(method='max', pct=True) * 100
+        # Anzahl der Spieler der Position
+        self.total = positions.groupby(positions, observed=True, sort=False).transform('size')
+
+    def get(self, label, attribute: str) -> tuple[float, int]:
+        """
+        Returns the rank and the group size of a player for an attribute.
+
+        Parameters:
+        label: The index label of the player in the data the table was built from.
+        attribute (str): The z-score column.
+
+        Returns:
+        tuple[float, int]: The rank (NaN if the value is missing) and the number of players of the position.
+        """
+        return self.rank.at[label, attribute], int(self.total.at[label])
+
+    def lookup(self, index: pd.Index, attribute: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ranks and the group sizes of several players for an attribute.
+
+        Parameters:
+        index (pd.Index): The index labels of the players.
+        attribute (str): The z-score column.
+
+        Returns:
+        tuple[np.ndarray, np.ndarray]: The ranks and the group sizes.
+        """
+        return self.rank.loc[index, attribute].to_numpy(), self.total.loc[index].to_numpy()
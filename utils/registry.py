@@ -0,0 +1,186 @@
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DatasetInfo:
+    """
+    Metadata of a dataset stored in the registry.
+
+    Attributes:
+    league (str): The league of the dataset.
+    season (str): The season of the dataset.
+    rows (int): The number of rows.
+    load_seconds (float): How long loading the dataset took.
+    loaded_at (datetime): When the dataset was loaded.
+    memory_bytes (int): The memory size of the DataFrame.
+    source_version (str | None): The version of the source table at load time.
+    bytes_saved (int): The memory saved by the compact schema.
+    """
+    league: str
+    season: str
+    rows: int
+    load_seconds: float
+    loaded_at: datetime = field(default_factory=datetime.now)
+    memory_bytes: int = 0
+    source_version: str | None = None
+    bytes_saved: int = 0
+
+
+class DatasetRegistry:
+    """
+    Keeps the stats DataFrames of all leagues and seasons, keyed by (league, season).
+    Lookups are dictionary accesses, so they are cheap on every page rerun.
+
+    If a loader is given, datasets that are not in the registry yet are loaded the first time they are requested.
+    The loader is called with (league, season) and returns the data and a dict with the keyword arguments
+    for put (load_seconds, source_version, bytes_saved).
+    """
+
+    def __init__(self, loader: Callable[[str, str], tuple[pd.DataFrame, dict]] | None = None):
+        self._data = {}
+        self._info = {}
+        self._lock = threading.Lock()
+        self._loader = loader
+        self._key_locks = {}
+        self._derived = {}
+
+    def put(self, league: str, season: str, data: pd.DataFrame, load_seconds: float = 0.0,
+            source_version: str | None = None, bytes_saved: int = 0) -> DatasetInfo:
+        """
+        Stores a dataset together with its metadata.
+
+        Parameters:
+        league (str): The league of the dataset.
+        season (str): The season of the dataset.
+        data (pd.DataFrame): The dataset.
+        load_seconds (float): How long loading the dataset took.
+        source_version (str | None): The version of the source table.
+        bytes_saved (int): The memory saved by the compact schema.
+
+        Returns:
+        DatasetInfo: The metadata of the stored dataset.
+        """
+        info = DatasetInfo(
+            league=league,
+            season=season,
+            rows=len(data),
+            load_seconds=load_seconds,
+            memory_bytes=int(data.memory_usage(deep=True).sum()),
+            source_version=source_version,
+            bytes_saved=bytes_saved,
+        )
+        with self._lock:
+            self._data[(league, season)] = data
+            self._info[(league, season)] = info
+            # Abgeleitete Strukturen des alten Datensatzes verwerfen
+            self._derived = {key: value for key, value in self._derived.items() if key[:2] != (league, season)}
+        return info
+
+    def get(self, league: str, season: str) -> pd.DataFrame | None:
+        """
+        Returns the dataset for a league and season.
+
+        Parameters:
+        league (str): The league of the dataset.
+        season (str): The season of the dataset.
+
+        Returns:
+        pd.DataFrame | None: The dataset or None if it is not in the registry and could not be loaded.
+        """
+        data = self._data.get((league, season))
+        if data is None and self._loader is not None:
+            data = self.load(league, season)
+        if data is None:
+            print(f"No data found for league: {league}, season: {season}")
+        return data
+
+    def load(self, league: str, season: str) -> pd.DataFrame | None:
+        """
+        Loads a dataset with the loader unless it is already in the registry.
+        Concurrent requests for the same dataset wait for a single load.
+
+        Parameters:
+        league (str): The league of the dataset.
+        season (str): The season of the dataset.
+
+        Returns:
+        pd.DataFrame | None: The dataset or None if loading failed.
+        """
+        key = (league, season)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            data = self._data.get(key)
+            if data is not None:
+                return data
+            data, metadata = self._loader(league, season)
+            # Fehlgeschlagene Ladevorgänge nicht speichern, damit sie beim nächsten Aufruf wiederholt werden
+            if data is None or data.empty:
+                return None
+            self.put(league, season, data, **metadata)
+            print("Data loaded on demand for", league, season)
+            return data
+
+    def derived(self, league: str, season: str, name, build: Callable[[pd.DataFrame], object]):
+        """
+        Returns a structure derived from a dataset (e.g. an index or a matrix), built once per dataset
+        and dropped when the dataset is replaced.
+
+        Parameters:
+        league (str): The league of the dataset.
+        season (str): The season of the dataset.
+        name: A hashable name of the structure, e.g. ('scoring', position).
+        build (Callable[[pd.DataFrame], object]): Builds the structure from the dataset.
+
+        Returns:
+        object: The structure or None if the dataset is not available.
+        """
+        key = (league, season, name)
+        if key in self._derived:
+            return self._derived[key]
+        data = self.get(league, season)
+        if data is None:
+            return None
+        value = build(data)
+        with self._lock:
+            # Nur speichern, wenn der Datensatz in der Zwischenzeit nicht ersetzt wurde
+            if self._data.get((league, season)) is data:
+                self._derived[key] = value
+        return value
+
+    def info(self, league: str, season: str) -> DatasetInfo | None:
+        """
+        Returns the metadata of a dataset.
+
+        Parameters:
+        league (str): The league of the dataset.
+        season (str): The season of the dataset.
+
+        Returns:
+        DatasetInfo | None: The metadata or None if the dataset is not in the registry.
+        """
+        return self._info.get((league, season))
+
+    def keys(self) -> list[tuple[str, str]]:
+        """
+        Returns the (league, season) keys of all stored datasets.
+        """
+        return list(self._data.keys())
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns the metadata of all stored datasets as a DataFrame.
+        """
+        return pd.DataFrame([vars(info) for info in self._info.values()])
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
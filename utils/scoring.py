@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+# Spalten, die neben dem Score in der Ergebnistabelle der Spielersuche stehen
+PLAYER_COLUMNS = ['player_name', 'team_name', 'position', 'minutes_played']
+
+
+class ScoringMatrix:
+    """
+    The z-scores of all players of one league, season and position as a contiguous float32 matrix.
+    A weighted score over any set of qualities is a single matrix-vector product.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.columns = [column for column in data.columns if column.endswith('_z')]
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+        self.players = data[PLAYER_COLUMNS].reset_index(drop=True)
+        values = np.ascontiguousarray(data[self.columns].to_numpy(dtype=np.float32))
+        # Fehlende Werte werden für das Produkt durch 0 ersetzt und danach wieder als NaN markiert
+        self._missing = np.isnan(values)
+        self.matrix = np.where(self._missing, np.float32(0), values)
+
+    def weights(self, quality_values: dict) -> np.ndarray:
+        """
+        Returns the weight vector for the selected qualities (importance 1, 3 or 5, scaled by 1/5).
+
+        Parameters:
+        quality_values (dict): The selected qualities mapped to their importance.
+
+        Returns:
+        np.ndarray: One weight per column of the matrix.
+        """
+        weights = np.zeros(len(self.columns), dtype=np.float32)
+        for key, value in quality_values.items():
+            weights[self._column_index[key]] = value / 5
+        return weights
+
+    def score(self, quality_values: dict, rows: slice | np.ndarray = slice(None)) -> np.ndarray:
+        """
+        Computes the weighted score of the players.
+
+        Parameters:
+        quality_values (dict): The selected qualities mapped to their importance.
+        rows (slice | np.ndarray): The rows of the matrix to score.
+
+        Returns:
+        np.ndarray: The score of every selected player. NaN if a selected quality is missing for the player.
+        """
+        weights = self.weights(quality_values)
+        scores = self.matrix[rows] @ weights
+        selected = [self._column_index[key] for key in quality_values]
+        if selected:
+            scores[self._missing[rows][:, selected].any(axis=1)] = np.nan
+        return scores
+
+
+def top_k(scores: np.ndarray, k: int | None = None) -> np.ndarray:
+    """
+    Returns the positions of the k highest scores in descending order. Missing scores come last.
+    Only the k best entries are sorted (argpartition); with k=None all entries are sorted.
+
+    Parameters:
+    scores (np.ndarray): The scores.
+    k (int | None): The number of entries to return. All entries if None.
+
+    Returns:
+    np.ndarray: The positions of the best entries.
+    """
+    keys = np.where(np.isnan(scores), -np.inf, -scores)
+    if k is None or k >= len(scores):
+        return np.argsort(keys, kind='stable')
+    candidates = np.argpartition(keys, k - 1)[:k] if k > 0 else np.array([], dtype=np.intp)
+    return candidates[np.argsort(keys[candidates], kind='stable')]
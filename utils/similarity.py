@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+# Spalten, die neben der Distanz in der Ergebnistabelle der ähnlichen Spieler stehen
+PLAYER_COLUMNS = ['player_name', 'team_name', 'position', 'minutes_played']
+
+# Anzahl der Anfragevektoren, deren Distanzen gemeinsam berechnet werden
+BLOCK_SIZE = 1024
+
+
+class NeighbourIndex:
+    """
+    The attribute z-scores of all players of one position as a contiguous float32 matrix with precomputed
+    squared norms. The squared euclidean distances of a block of query vectors to all players are one
+    matrix product (|q|² - 2 q·p + |p|²), so a nearest neighbour query needs no pairwise scan in pandas.
+    Missing z-scores are treated as 0, i.e. as the average of the position.
+    """
+
+    def __init__(self, data: pd.DataFrame, columns: list[str]):
+        self.columns = [column for column in columns if column in data.columns]
+        self.players = data[[column for column in PLAYER_COLUMNS if column in data.columns]].reset_index(drop=True)
+        values = data[self.columns].to_numpy(dtype=np.float32)
+        self.matrix = np.ascontiguousarray(np.nan_to_num(values, nan=0.0))
+        self._norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the attribute vectors of the given rows.
+
+        Parameters:
+        rows (np.ndarray): Rows of the index.
+
+        Returns:
+        np.ndarray: One vector per row.
+        """
+        return self.matrix[rows]
+
+    def rows(self, player_name: str) -> np.ndarray:
+        """
+        Returns the rows of a player in the index.
+
+        Parameters:
+        player_name (str): The name of the player.
+
+        Returns:
+        np.ndarray: The rows of the player, empty if the player is not in the index.
+        """
+        return np.flatnonzero(self.players['player_name'].to_numpy() == player_name)
+
+    def query(self, vectors: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the n nearest players for every query vector.
+
+        Parameters:
+        vectors (np.ndarray): The query vectors, one per row, with the columns of the index.
+        n (int): The number of neighbours per query.
+
+        Returns:
+        tuple[np.ndarray, np.ndarray]: The distances and rows of the neighbours, both with one row per query
+            sorted by distance.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        n = min(n, len(self.matrix))
+        distances = np.empty((len(vectors), n), dtype=np.float32)
+        rows = np.empty((len(vectors), n), dtype=np.intp)
+        if n == 0:
+            return distances, rows
+
+        for start in range(0, len(vectors), BLOCK_SIZE):
+            block = vectors[start:start + BLOCK_SIZE]
+            squared = (np.einsum('ij,ij->i', block, block)[:, None]
+                       - 2 * (block @ self.matrix.T)
+                       + self._norms[None, :])
+            # Nur die n besten Kandidaten je Anfrage sortieren
+            candidates = np.argpartition(squared, n - 1, axis=1)[:, :n]
+            candidate_distances = np.take_along_axis(squared, candidates, axis=1)
+            order = np.argsort(candidate_distances, axis=1, kind='stable')
+            rows[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+            # Rundungsfehler können leicht negative Werte ergeben
+            distances[start:start + len(block)] = np.sqrt(
+                np.maximum(np.take_along_axis(candidate_distances, order, axis=1), 0))
+        return distances, rows
@@ -0,0 +1,103 @@
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Verzeichnis für lokale Snapshots der Datenbanktabellen
+SNAPSHOT_DIR = Path(os.environ.get('DATENFLANKE_SNAPSHOT_DIR', '.snapshots'))
+
+# Erhöhen, wenn sich die Abfragen oder das Format der Snapshots ändern, damit alte Dateien verworfen werden
+SNAPSHOT_FORMAT = '1'
+
+_VERSION_KEY = b'datenflanke_version'
+
+
+def snapshot_path(table: str) -> Path:
+    """
+    Returns the path of the snapshot file for a table.
+
+    Parameters:
+    table (str): The name of the table.
+
+    Returns:
+    Path: The path of the Parquet file.
+    """
+    return SNAPSHOT_DIR / f"{table}.parquet"
+
+
+def _full_version(version: str) -> bytes:
+    return f"{SNAPSHOT_FORMAT}:{version}".encode()
+
+
+def read_snapshot(table: str, version: str | None) -> pd.DataFrame | None:
+    """
+    Reads the snapshot of a table if it exists and was written for the given version.
+
+    Parameters:
+    table (str): The name of the table.
+    version (str | None): The current version of the source table.
+
+    Returns:
+    pd.DataFrame | None: The snapshot or None if there is no valid snapshot.
+    """
+    path = snapshot_path(table)
+    # Ohne bekannte Version kann nicht geprüft werden, ob der Snapshot aktuell ist
+    if version is None or not path.exists():
+        return None
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        if metadata.get(_VERSION_KEY) != _full_version(version):
+            return None
+        return pq.read_table(path).to_pandas()
+    except Exception as e:
+        print(f"Fehler beim Lesen des Snapshots {path}: {e}")
+        return None
+
+
+def write_snapshot(table: str, data: pd.DataFrame, version: str | None):
+    """
+    Writes a snapshot of a table. The file is replaced atomically, so readers never see a partial file.
+
+    Parameters:
+    table (str): The name of the table.
+    data (pd.DataFrame): The data of the table.
+    version (str | None): The version of the source table the data was loaded from.
+    """
+    if version is None or data.empty:
+        return
+    path = snapshot_path(table)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrow_table = pa.Table.from_pandas(data, preserve_index=False)
+        metadata = {**(arrow_table.schema.metadata or {}), _VERSION_KEY: _full_version(version)}
+        pq.write_table(arrow_table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Fehler beim Schreiben des Snapshots {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def cached_table(table: str, version: str | None, load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Returns the data of a table from its local snapshot or loads it and writes a new snapshot.
+
+    Parameters:
+    table (str): The name of the table.
+    version (str | None): The current version of the source table. Without a version no snapshot is used.
+    load (Callable[[], pd.DataFrame]): Loads the data from the database.
+
+    Returns:
+    pd.DataFrame: The data of the table.
+    """
+    data = read_snapshot(table, version)
+    if data is not None:
+        print("Snapshot used for", table)
+        return data
+    data = load()
+    write_snapshot(table, data, version)
+    return data